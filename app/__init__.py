@@ -2,11 +2,12 @@ from flask import Flask
 from config import Config
 import sqlite3
 import os
+import time
 
 # Set up SQLite DB
 def init_db():
-    os.makedirs("data", exist_ok=True)
-    conn = sqlite3.connect("data/db.sqlite3")
+    os.makedirs(os.path.dirname(Config.DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(Config.DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS atis_log (
@@ -17,18 +18,46 @@ def init_db():
             fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    # Match the two history keyset orders so pages are index range scans:
+    # by airport when airports are given, by time across all airports otherwise
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_atis_log_airport_time
+        ON atis_log (airport, fetched_at, id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_atis_log_time
+        ON atis_log (fetched_at, id)
+    """)
     conn.commit()
     conn.close()
 
 # Create Flask app
 def create_app():
+    started = time.monotonic()
     app = Flask(__name__, template_folder="../templates", static_folder="../static")
     app.config.from_object(Config)
 
     init_db()
 
+    # Last ATIS per airport lives in memory; changes are written behind in batches
+    from app.atis import warm_atis_cache, start_atis_writer
+    warm_atis_cache()
+    start_atis_writer()
+
     from app.routes import main
     app.register_blueprint(main)
 
+    # Load airports in the background so the worker can take traffic immediately
+    if app.config.get("AIRPORTS_PRELOAD"):
+        from app.airports import preload_airports
+        preload_airports()
+
+    if app.config.get("ROUTE_WARMER_ENABLED"):
+        from app.warmer import start_route_warmer
+        start_route_warmer()
+
+    app.config["STARTUP_SECONDS"] = round(time.monotonic() - started, 3)
+    print(f"App created in {app.config['STARTUP_SECONDS']}s.")
+
     return app
 
@@ -1,12 +1,25 @@
 import csv
 import io
 import os
+import math
+import time
+import bisect
+import threading
 import requests
+from functools import lru_cache
+from config import Config
+from app.shared_cache import get_or_compute
+from app import singleflight
 
 AIRPORTS_URL = "https://davidmegginson.github.io/ourairports-data/airports.csv"
 AIRPORTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "airports.csv")
 
 _cache = {}
+_load_state = {"error": None, "load_seconds": None}
+
+# Search indexes over _cache, built alongside it at load time
+_index = {"idents": [], "names": [], "trigrams": {}, "grid": {}}
+GRID_DEG = 1.0      # Grid cell size for spatial lookups
 
 def download_airports_csv():
     """Download airports.csv from OurAirports if not already present."""
@@ -16,16 +29,97 @@ def download_airports_csv():
     os.makedirs(os.path.dirname(AIRPORTS_CSV), exist_ok=True)
     response = requests.get(AIRPORTS_URL, timeout=30)
     response.raise_for_status()
-    with open(AIRPORTS_CSV, "w", encoding="utf-8") as f:
+    # Write to a temp file and swap it in so other workers never read a partial CSV
+    tmp_path = f"{AIRPORTS_CSV}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         f.write(response.text)
+    os.replace(tmp_path, AIRPORTS_CSV)
     print("Airports database downloaded successfully.")
 
 
 def load_airports():
-    """Load airport data from CSV into memory cache."""
-    if _cache:
-        return _cache
+    """
+    Load airport data into memory cache. The CSV is downloaded and parsed
+    once per host; other workers load the parsed result from the shared cache.
+    """
+    if not _cache:
+        # Requests arriving mid-preload wait on the same load instead of starting another
+        singleflight.do("airports", _fill_cache)
+    return _cache
+
+
+def _fill_cache():
+    if not _cache:
+        airports = get_or_compute("airports", Config.AIRPORTS_CACHE_SECONDS, parse_airports_csv)
+        # Index first so search never sees a loaded-but-unindexed cache
+        _index.update(build_index(airports))
+        _cache.update(airports)
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _grid_cell(lat: float, lon: float) -> tuple:
+    return (math.floor(lat / GRID_DEG), math.floor(lon / GRID_DEG))
+
+
+def build_index(airports: dict) -> dict:
+    """
+    Build the search indexes: sorted ident and name lists for prefix lookups,
+    a trigram index over lowercased names for substring lookups, and a lat/lon grid.
+    Trigram postings are positions in the sorted name list, so they come out in name order.
+    """
+    names = sorted((airport["name"].lower(), icao) for icao, airport in airports.items())
+    trigrams = {}
+    for position, (name, _) in enumerate(names):
+        for gram in _trigrams(name):
+            trigrams.setdefault(gram, []).append(position)
+
+    grid = {}
+    for icao, airport in airports.items():
+        grid.setdefault(_grid_cell(airport["latitude"], airport["longitude"]), []).append(icao)
+
+    return {
+        "idents": sorted(airports),
+        "names": names,
+        "trigrams": trigrams,
+        "grid": grid,
+    }
+
+
+def preload_airports() -> threading.Thread:
+    """Load the airport database on a background thread so app startup doesn't block on it."""
+    def run():
+        started = time.monotonic()
+        try:
+            load_airports()
+        except Exception as e:
+            _load_state["error"] = str(e)
+            print(f"Airport preload failed: {e}")
+            return
+        _load_state["load_seconds"] = round(time.monotonic() - started, 2)
+        print(f"Airports database loaded in {_load_state['load_seconds']}s.")
+
+    thread = threading.Thread(target=run, name="airport-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def airports_status() -> dict:
+    """Report whether the airport database is loaded and ready to serve lookups."""
+    return {
+        "ready": bool(_cache),
+        "count": len(_cache),
+        "load_seconds": _load_state["load_seconds"],
+        "error": _load_state["error"],
+    }
+
+
+def parse_airports_csv() -> dict:
+    """Download (if needed) and parse airports.csv into {icao: airport} records."""
     download_airports_csv()
+    airports = {}
     with open(AIRPORTS_CSV, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
@@ -33,7 +127,7 @@ def load_airports():
             try:
                 lat = float(row["latitude_deg"])
                 lon = float(row["longitude_deg"])
-                _cache[icao] = {
+                airports[icao] = {
                     "icao": icao,
                     "name": row.get("name", ""),
                     "latitude": lat,
@@ -41,7 +135,7 @@ def load_airports():
                 }
             except (ValueError, KeyError):
                 continue
-    return _cache
+    return airports
 
 
 def get_airport(icao: str) -> dict | None:
@@ -55,4 +149,187 @@ def get_coords(icao: str) -> tuple | None:
     airport = get_airport(icao)
     if airport:
         return (airport["latitude"], airport["longitude"])
-    return None
\ No newline at end of file
+    return None
+
+
+def _ident_prefix_matches(prefix: str, limit: int) -> list[str]:
+    idents = _index["idents"]
+    start = bisect.bisect_left(idents, prefix)
+    matches = []
+    for icao in idents[start:start + limit]:
+        if not icao.startswith(prefix):
+            break
+        matches.append(icao)
+    return matches
+
+
+def _name_prefix_matches(prefix: str, limit: int) -> list[str]:
+    names = _index["names"]
+    start = bisect.bisect_left(names, (prefix,))
+    matches = []
+    for name, icao in names[start:start + limit]:
+        if not name.startswith(prefix):
+            break
+        matches.append(icao)
+    return matches
+
+
+def _name_substring_matches(needle: str, limit: int, skip: set) -> list[str]:
+    """Walk the rarest trigram's postings in name order, stopping once limit names contain needle."""
+    trigrams = _index["trigrams"]
+    postings = [trigrams.get(gram, []) for gram in _trigrams(needle)]
+    if not postings:
+        return []
+    names = _index["names"]
+    matches = []
+    for position in min(postings, key=len):
+        name, icao = names[position]
+        if needle in name and icao not in skip:
+            matches.append(icao)
+            if len(matches) >= limit:
+                break
+    return matches
+
+
+def search_airports(query: str, limit: int = 10) -> list[dict]:
+    """
+    Search airports by ident or name. Exact ident matches rank first, then
+    ident prefixes, then names starting with the query, then names containing it.
+    """
+    load_airports()
+    query = query.strip()
+    if not query:
+        return []
+
+    ranked = []
+
+    def add(icaos):
+        for icao in icaos:
+            if icao not in ranked and len(ranked) < limit:
+                ranked.append(icao)
+
+    ident = query.upper()
+    if ident in _cache:
+        add([ident])
+    add(_ident_prefix_matches(ident, limit))
+
+    needle = query.lower()
+    if len(ranked) < limit:
+        add(_name_prefix_matches(needle, limit))
+    if len(ranked) < limit and len(needle) >= 3:
+        add(_name_substring_matches(needle, limit - len(ranked), set(ranked)))
+
+    return [_cache[icao] for icao in ranked]
+
+
+def _distance_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Haversine distance in nautical miles; plenty accurate for ranking nearby airports."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * 3440.065 * math.asin(math.sqrt(min(1.0, a)))
+
+
+def _grid_candidates(min_lat: float, min_lon: float, max_lat: float, max_lon: float):
+    """
+    Yield icao codes in grid cells overlapping a lat/lon box. Longitudes past
+    ±180 wrap around, so boxes crossing the antimeridian find both sides.
+    """
+    grid = _index["grid"]
+    cells_around = round(360 / GRID_DEG)
+    min_cell = _grid_cell(min_lat, min_lon)
+    max_cell = _grid_cell(max_lat, max_lon)
+    lon_cells = range(min_cell[1], max_cell[1] + 1)
+    if len(lon_cells) >= cells_around:
+        lon_cells = range(-cells_around // 2, cells_around // 2)
+    for cy in range(min_cell[0], max_cell[0] + 1):
+        for cx in lon_cells:
+            wrapped = (cx + cells_around // 2) % cells_around - cells_around // 2
+            yield from grid.get((cy, wrapped), ())
+
+
+def nearby_airports(lat: float, lon: float, radius_nm: float = None, limit: int = 10) -> list[dict]:
+    """Return airports within radius_nm of a point, nearest first, each with distance_nm."""
+    load_airports()
+    radius_nm = radius_nm or Config.AIRPORT_NEARBY_RADIUS_NM
+    dlat = radius_nm / 60
+    dlon = min(180.0, radius_nm / (60 * max(0.01, math.cos(math.radians(min(89.0, abs(lat) + dlat))))))
+
+    results = []
+    for icao in _grid_candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+        airport = _cache[icao]
+        distance = _distance_nm(lat, lon, airport["latitude"], airport["longitude"])
+        if distance <= radius_nm:
+            results.append((distance, icao))
+    results.sort()
+    return [dict(_cache[icao], distance_nm=round(distance, 1)) for distance, icao in results[:limit]]
+
+
+def airports_in_corridor(corridor, route_line) -> list[dict]:
+    """
+    Return every airport inside a route corridor polygon, ordered by position
+    along route_line from origin to destination. Each carries along_route_nm
+    and off_route_nm. The grid is used to skip far-away cells.
+    """
+    import shapely
+    from shapely.geometry import LineString
+    from app.corridor import unwrap_longitudes
+    load_airports()
+    # Corridors over the antimeridian come in pieces; scan each piece's cells, not the whole globe
+    parts = getattr(corridor, "geoms", [corridor])
+    icaos = list(dict.fromkeys(
+        icao
+        for part in parts
+        for icao in _grid_candidates(part.bounds[1], part.bounds[0], part.bounds[3], part.bounds[2])
+    ))
+    if not icaos:
+        return []
+    lats = [_cache[icao]["latitude"] for icao in icaos]
+    lons = [_cache[icao]["longitude"] for icao in icaos]
+    shapely.prepare(corridor)
+    inside = shapely.contains_xy(corridor, lons, lats)
+    hits = [i for i, hit in enumerate(inside) if hit]
+    if not hits:
+        return []
+
+    # Position along the route as a fraction of its length, and the nearest point on it.
+    # Measured with continuous longitudes so a route over the antimeridian is one line
+    line_lons = unwrap_longitudes([lon for lon, _ in route_line.coords])
+    route_line = LineString(zip(line_lons, (lat for _, lat in route_line.coords)))
+    center_lon = (min(line_lons) + max(line_lons)) / 2
+    points = shapely.points(
+        [center_lon + (lons[i] - center_lon + 180) % 360 - 180 for i in hits],
+        [lats[i] for i in hits]
+    )
+    fractions = shapely.line_locate_point(route_line, points, normalized=True)
+    # Read the nearest points' coords in one call; per-point .x/.y access dominates on long routes
+    nearest = shapely.get_coordinates(shapely.line_interpolate_point(route_line, fractions, normalized=True))
+    coords = list(route_line.coords)
+    route_nm = sum(_distance_nm(a[1], a[0], b[1], b[0]) for a, b in zip(coords, coords[1:]))
+
+    results = []
+    for i, fraction, (near_lon, near_lat) in zip(hits, fractions.tolist(), nearest.tolist()):
+        off_route = _distance_nm(lats[i], lons[i], near_lat, near_lon)
+        results.append((fraction, dict(
+            _cache[icaos[i]],
+            along_route_nm=round(fraction * route_nm, 1),
+            off_route_nm=round(off_route, 1),
+        )))
+    # Airports beyond either end all project onto it, so break ties by distance off the route
+    results.sort(key=lambda r: (r[0], r[1]["off_route_nm"]))
+    return [airport for _, airport in results]
+
+
+@lru_cache(maxsize=Config.CORRIDOR_CACHE_SIZE)
+def airports_along_route(origin: tuple, destination: tuple) -> tuple:
+    """
+    Return airports_in_corridor for a route as an immutable tuple, memoized by the
+    route's coords like build_corridor so paging through the list doesn't rebuild it.
+    The airport set is loaded once per process, so the memoized lists never go stale.
+    """
+    from app.corridor import build_corridor, build_great_circle_line
+    return tuple(airports_in_corridor(
+        build_corridor(origin, destination),
+        build_great_circle_line(origin, destination)
+    ))
@@ -1,20 +1,46 @@
+import re
+import json
+import base64
+import atexit
+import hashlib
 import sqlite3
-import requests
+import threading
+from datetime import datetime, timezone
 from config import Config
+from app import singleflight
+from app.shared_cache import cache_update, get_or_compute
+from app.upstream import upstream_get, unavailable_source, UpstreamUnavailable
+
+# Last observation this worker saw per airport; unchanged polls compare against this with no I/O.
+# The host-wide last observation, which decides what gets saved, lives in the shared cache.
+_last_obs = {}
+
+# Changed observations waiting to be written to SQLite in a batch
+_pending_writes = []
+_pending_lock = threading.Lock()
+_flush_event = threading.Event()
+_writer = None
 
 def fetch_atis(airport_icao: str) -> dict | None:
     """
     Fetch current ATIS for a given airport from AviationWeather.gov.
-    Returns a dict with 'identifier' and 'raw_text', or None if unavailable.
+    Returns a dict with 'identifier', 'raw_text' and the data's freshness under
+    'source', or None if unavailable. Fetched once per host per
+    ATIS_FETCH_CACHE_SECONDS, so several workers polling share one METAR request.
     """
-    url = f"{Config.AVIATIONWEATHER_BASE_URL}/metar"
+    return get_or_compute(
+        f"metar:{airport_icao}",
+        Config.ATIS_FETCH_CACHE_SECONDS,
+        lambda: _fetch_atis(airport_icao)
+    )
+
+
+def _fetch_atis(airport_icao: str) -> dict | None:
     params = {
         "ids": airport_icao,
         "format": "json",
     }
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
-    data = response.json()
+    data, source = upstream_get("metar", params)
 
     if not data:
         return None
@@ -24,6 +50,7 @@ def fetch_atis(airport_icao: str) -> dict | None:
         "airport": airport_icao,
         "identifier": metar.get("metarType", "UNKNOWN"),
         "raw_text": metar.get("rawOb", ""),
+        "source": source,
     }
 
 
@@ -35,7 +62,7 @@ def get_last_atis(airport_icao: str) -> dict | None:
         SELECT airport, identifier, raw_text, fetched_at
         FROM atis_log
         WHERE airport = ?
-        ORDER BY fetched_at DESC
+        ORDER BY fetched_at DESC, id DESC
         LIMIT 1
     """, (airport_icao,))
     row = cursor.fetchone()
@@ -58,38 +85,376 @@ def save_atis(atis: dict):
     conn.close()
 
 
+def save_atis_batch(rows: list[dict]):
+    """Persist several ATIS records in one transaction."""
+    if not rows:
+        return
+    conn = sqlite3.connect(Config.DB_PATH)
+    cursor = conn.cursor()
+    cursor.executemany("""
+        INSERT INTO atis_log (airport, identifier, raw_text, fetched_at)
+        VALUES (?, ?, ?, ?)
+    """, [(r["airport"], r["identifier"], r["raw_text"], r["fetched_at"]) for r in rows])
+    conn.commit()
+    conn.close()
+
+
+def flush_atis_writes():
+    """Write all pending observations to SQLite now."""
+    with _pending_lock:
+        rows = _pending_writes[:]
+        del _pending_writes[:]
+    try:
+        save_atis_batch(rows)
+    except sqlite3.Error as e:
+        # Put them back so the next flush retries
+        with _pending_lock:
+            _pending_writes[:0] = rows
+        print(f"ATIS flush failed: {e}")
+
+
+def _writer_loop():
+    while True:
+        _flush_event.wait(Config.ATIS_FLUSH_SECONDS)
+        _flush_event.clear()
+        flush_atis_writes()
+
+
+def start_atis_writer():
+    """Start the background write-behind thread (once per process)."""
+    global _writer
+    if _writer is None:
+        _writer = threading.Thread(target=_writer_loop, name="atis-writer", daemon=True)
+        _writer.start()
+        atexit.register(flush_atis_writes)
+    return _writer
+
+
+def _queue_save(atis: dict):
+    """Queue an observation for the write-behind thread instead of writing inline."""
+    with _pending_lock:
+        _pending_writes.append(atis)
+        full = len(_pending_writes) >= Config.ATIS_FLUSH_BATCH_SIZE
+    start_atis_writer()
+    if full:
+        _flush_event.set()
+
+
+def warm_atis_cache():
+    """Load the latest stored observation for every airport into memory."""
+    conn = sqlite3.connect(Config.DB_PATH)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT airport, identifier, raw_text, fetched_at
+        FROM atis_log
+        WHERE id IN (SELECT MAX(id) FROM atis_log GROUP BY airport)
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+    for airport, identifier, raw_text, fetched_at in rows:
+        _remember({"airport": airport, "identifier": identifier, "raw_text": raw_text, "fetched_at": fetched_at})
+
+
+def _content_hash(atis: dict) -> str:
+    return hashlib.sha1(atis["raw_text"].encode("utf-8")).hexdigest()
+
+
+def _remember(atis: dict) -> dict:
+    """Cache an observation with its content hash and decoded fields."""
+    obs = dict(atis)
+    obs["hash"] = _content_hash(atis)
+    obs["fields"] = decode_metar(atis["raw_text"])
+    _last_obs[atis["airport"]] = obs
+    return obs
+
+
+def _seed_observation(airport_icao: str) -> dict | None:
+    """The newest of this worker's observation and the stored one, for when the host has none cached."""
+    candidates = [obs for obs in (_last_obs.get(airport_icao), get_last_atis(airport_icao)) if obs]
+    if not candidates:
+        return None
+    latest = max(candidates, key=lambda obs: obs["fetched_at"] or "")
+    return dict(latest, hash=_content_hash(latest))
+
+
+def _swap_last_observation(current: dict, current_hash: str) -> tuple[dict | None, bool]:
+    """
+    Compare-and-set the host-wide last observation for current's airport.
+    Returns (previous observation, recorded). recorded is False when the host
+    already has this observation, so if several workers see the same new METAR
+    only one of them saves it and reports the change.
+    """
+    airport_icao = current["airport"]
+    outcome = {"previous": None, "recorded": False}
+
+    def swap(shared):
+        previous = shared or _seed_observation(airport_icao)
+        outcome["previous"] = previous
+        if previous and previous["hash"] == current_hash:
+            return previous
+        outcome["recorded"] = True
+        record = {k: current[k] for k in ("airport", "identifier", "raw_text", "fetched_at")}
+        record["hash"] = current_hash
+        return record
+
+    cache_update(f"atis_last:{airport_icao}", Config.ATIS_SHARED_SECONDS, swap)
+    return outcome["previous"], outcome["recorded"]
+
+
+def _parse_visibility(token: str) -> float | None:
+    """Parse a statute-mile visibility token such as 10SM, 1/2SM, 1 1/2SM or M1/4SM."""
+    value = token[:-2].lstrip("MP").strip()
+    try:
+        total = 0.0
+        for part in value.split():
+            if "/" in part:
+                num, den = part.split("/")
+                total += int(num) / int(den)
+            else:
+                total += int(part)
+        return total
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def decode_metar(raw_text: str) -> dict:
+    """
+    Decode the fields crews compare between observations:
+    wind, visibility (SM), ceiling (ft AGL, lowest BKN/OVC/VV) and altimeter (inHg).
+    Missing fields are None.
+    """
+    fields = {"wind": None, "visibility_sm": None, "ceiling_ft": None, "altimeter_inhg": None}
+
+    wind = re.search(r"\b(\d{3}|VRB)(\d{2,3})(?:G(\d{2,3}))?KT\b", raw_text)
+    if wind:
+        fields["wind"] = {
+            "direction": None if wind.group(1) == "VRB" else int(wind.group(1)),
+            "speed_kt": int(wind.group(2)),
+            "gust_kt": int(wind.group(3)) if wind.group(3) else None,
+        }
+
+    vis = re.search(r"(?<![\d/])([MP]?(?:\d+ )?\d+(?:/\d+)?SM)\b", raw_text)
+    if vis:
+        fields["visibility_sm"] = _parse_visibility(vis.group(1))
+
+    ceilings = [int(h) * 100 for h in re.findall(r"\b(?:BKN|OVC|VV)(\d{3})\b", raw_text)]
+    if ceilings:
+        fields["ceiling_ft"] = min(ceilings)
+
+    altimeter = re.search(r"\bA(\d{4})\b", raw_text)
+    if altimeter:
+        fields["altimeter_inhg"] = int(altimeter.group(1)) / 100
+    return fields
+
+
+def diff_metar_fields(previous: dict, current: dict) -> dict:
+    """Return {field: {"previous": ..., "current": ...}} for each decoded field that changed."""
+    return {
+        name: {"previous": previous.get(name), "current": value}
+        for name, value in current.items()
+        if previous.get(name) != value
+    }
+
+
+HISTORY_COLUMNS = ("id", "airport", "identifier", "raw_text", "fetched_at")
+
+
+def normalize_timestamp(value: str) -> str:
+    """
+    Convert an ISO 8601 time to the UTC 'YYYY-MM-DD HH:MM:SS' format stored in atis_log.
+    Times without an offset are taken as UTC. Raises ValueError if unparseable.
+    """
+    parsed = datetime.fromisoformat(value.strip())
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _history_order(airports: list[str] = None) -> tuple:
+    """
+    Keyset columns for a history read: (airport, fetched_at, id) when filtering by
+    airport, otherwise (fetched_at, id) so time-range reads across every station
+    seek the time index instead of walking all rows in airport order.
+    """
+    return ("airport", "fetched_at", "id") if airports else ("fetched_at", "id")
+
+
+def encode_history_cursor(key: tuple) -> str:
+    """Opaque cursor for the keyset position just past a row."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """Inverse of encode_history_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        if not isinstance(key, list) or len(key) not in (2, 3):
+            raise ValueError
+        return tuple(str(v) for v in key[:-1]) + (int(key[-1]),)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _history_query(airport: str = None, start: str = None, end: str = None, after: tuple = None) -> tuple:
+    """
+    Build the SQL and params for a history read of one airport (or every station)
+    in (fetched_at, id) order, seeking past the (fetched_at, id) key after. Filtered
+    reads go one airport at a time: with airport IN (...) SQLite only uses the index
+    for the airport and scans each one from its first row instead of seeking.
+    """
+    clauses = []
+    params = []
+    if airport:
+        clauses.append("airport = ?")
+        params.append(airport)
+    if start:
+        clauses.append("fetched_at >= ?")
+        params.append(start)
+    if end:
+        clauses.append("fetched_at < ?")
+        params.append(end)
+    if after:
+        # Keyset pagination: seek past the last row instead of OFFSET scanning
+        clauses.append("(fetched_at, id) > (?, ?)")
+        params.extend(after)
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"""
+        SELECT {', '.join(HISTORY_COLUMNS)}
+        FROM atis_log
+        {where}
+        ORDER BY fetched_at, id
+        LIMIT ?
+    """
+    return sql, params
+
+
+def _read_history_page(airports: list[str], start: str, end: str, after: tuple, limit: int) -> tuple:
+    """
+    Read one page in a short-lived connection. Returns (rows, keyset position of the last row or None).
+    Raises ValueError on a cursor from a read with a different airport filter.
+    """
+    order = _history_order(airports)
+    if after and len(after) != len(order):
+        raise ValueError("Invalid cursor")
+    if airports:
+        # Walk the airports in order, resuming inside the cursor's airport; earlier ones are done
+        reads = [
+            (airport, after[1:] if after and airport == after[0] else None)
+            for airport in sorted(set(airports))
+            if not after or airport >= after[0]
+        ]
+    else:
+        reads = [(None, after)]
+
+    rows = []
+    conn = sqlite3.connect(Config.DB_PATH)
+    try:
+        for airport, seek in reads:
+            sql, params = _history_query(airport, start, end, seek)
+            rows.extend(dict(zip(HISTORY_COLUMNS, r)) for r in conn.execute(sql, params + [limit + 1 - len(rows)]))
+            if len(rows) > limit:
+                break
+    finally:
+        conn.close()
+
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], tuple(last[c] for c in order)
+
+
+def get_atis_history(airports: list[str] = None, start: str = None, end: str = None,
+                     after: tuple = None, limit: int = 100) -> tuple[list[dict], str | None]:
+    """
+    Return one page of stored observations and the cursor for the next page
+    (None on the last page). start/end are normalized timestamps; end is exclusive.
+    Pages are ordered by airport then time when airports are given, otherwise by time.
+    Raises ValueError if after came from a query with a different order.
+    """
+    flush_atis_writes()  # Include observations still waiting in the write-behind queue
+    rows, next_key = _read_history_page(airports, start, end, after, limit)
+    return rows, encode_history_cursor(next_key) if next_key else None
+
+
+def iter_atis_history(airports: list[str] = None, start: str = None, end: str = None):
+    """
+    Yield every matching observation in history order, ATIS_EXPORT_BATCH_SIZE
+    rows at a time so memory stays flat. Each batch is its own short read that
+    seeks past the previous one, so a long export never holds a read
+    transaction open against the write-behind flush.
+    """
+    flush_atis_writes()
+    after = None
+    while True:
+        rows, after = _read_history_page(airports, start, end, after, Config.ATIS_EXPORT_BATCH_SIZE)
+        yield from rows
+        if after is None:
+            break
+
+
 def check_for_atis_change(airport_icao: str) -> dict:
     """
     Core function: fetch current ATIS, compare to last known, save if changed.
-    Returns a dict describing what happened.
+    An unchanged poll compares against the in-memory observation and does no I/O;
+    a change is compare-and-set against the host-wide last observation, so with
+    several workers it is saved and reported once. Saves are written behind.
+    Returns a dict describing what happened, with a decoded field diff on change.
+    Concurrent checks for the same airport share one fetch, so a change is saved once.
     """
-    current = fetch_atis(airport_icao)
-    if not current:
-        return {"changed": False, "airport": airport_icao, "reason": "No ATIS available"}
+    return singleflight.do(("atis", airport_icao), lambda: _check_for_atis_change(airport_icao))
 
-    last = get_last_atis(airport_icao)
 
-    if not last:
-        save_atis(current)
+def _check_for_atis_change(airport_icao: str) -> dict:
+    try:
+        current = fetch_atis(airport_icao)
+    except UpstreamUnavailable as e:
         return {
             "changed": False,
             "airport": airport_icao,
-            "reason": "First observation saved",
-            "current": current["raw_text"]
+            "reason": "No ATIS available",
+            "source": unavailable_source("metar", e),
         }
+    if not current:
+        return {"changed": False, "airport": airport_icao, "reason": "No ATIS available"}
+
+    result = _compare_observation(airport_icao, current)
+    result["source"] = current.get("source")
+    return result
+
+
+def _compare_observation(airport_icao: str, current: dict) -> dict:
+    current["fetched_at"] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    current_hash = _content_hash(current)
+    no_change = {
+        "changed": False,
+        "airport": airport_icao,
+        "reason": "No change detected",
+        "current": current["raw_text"]
+    }
+
+    known = _last_obs.get(airport_icao)
+    if known and known["hash"] == current_hash:
+        return no_change
+
+    previous, recorded = _swap_last_observation(current, current_hash)
+    obs = _remember(current)
+    if not recorded:
+        return no_change  # Another worker already saved and reported it
 
-    if current["raw_text"] != last["raw_text"]:
-        save_atis(current)
+    _queue_save(current)
+    if not previous:
         return {
-            "changed": True,
+            "changed": False,
             "airport": airport_icao,
-            "previous": last["raw_text"],
-            "current": current["raw_text"],
+            "reason": "First observation saved",
+            "current": current["raw_text"]
         }
 
     return {
-        "changed": False,
+        "changed": True,
         "airport": airport_icao,
-        "reason": "No change detected",
-        "current": current["raw_text"]
-    }
\ No newline at end of file
+        "previous": previous["raw_text"],
+        "current": current["raw_text"],
+        "diff": diff_metar_fields(decode_metar(previous["raw_text"]), obs["fields"]),
+    }
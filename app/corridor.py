@@ -1,11 +1,16 @@
-import pyproj
-from shapely.geometry import Point, LineString
-from shapely.ops import transform
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from config import Config
+from app.shared_cache import get_or_compute
+
+# pyproj and shapely are imported inside the functions that need them to keep app startup fast
+if TYPE_CHECKING:
+    from shapely.geometry import LineString
 
 
 def calculate_distance_nm(origin: tuple, destination: tuple) -> float:
     """Calculate great circle distance in nautical miles between two (lat, lon) tuples."""
+    import pyproj
     geod = pyproj.Geod(ellps="WGS84")
     _, _, distance_m = geod.inv(
         origin[1], origin[0],
@@ -28,12 +33,14 @@ def compute_bbox(origin: tuple, destination: tuple, padding_deg: float = 1.0) ->
     return (min_lat, min_lon, max_lat, max_lon)
 
 
-def build_great_circle_line(origin: tuple, destination: tuple) -> LineString:
+def build_great_circle_line(origin: tuple, destination: tuple) -> "LineString":
     """
     Generate a LineString following the great circle path between two points.
     origin and destination are (lat, lon) tuples.
     Point count scales automatically with route distance
     """
+    import pyproj
+    from shapely.geometry import LineString
     geod = pyproj.Geod(ellps="WGS84")
 
     # Calculate total distance in nautical miles
@@ -59,21 +66,78 @@ def build_great_circle_line(origin: tuple, destination: tuple) -> LineString:
     return LineString(points)
 
 
+@lru_cache(maxsize=Config.CORRIDOR_CACHE_SIZE)
 def build_corridor(origin: tuple, destination: tuple, width_nm: float = Config.CORRIDOR_WIDTH_NM):
     """
     Build a buffered corridor around a great circle route.
     origin and destination are (lat, lon) tuples.
     width_nm is the buffer width in nautical miles on each side.
+    Corridors are deterministic, so results are memoized per route and shared across workers.
+    """
+    key = f"corridor:v2:{origin}:{destination}:{width_nm}"  # v2: split at the antimeridian
+    return get_or_compute(
+        key,
+        Config.CORRIDOR_CACHE_SECONDS,
+        lambda: _buffer_route(origin, destination, width_nm)
+    )
+
+
+def unwrap_longitudes(lons: list[float]) -> list[float]:
+    """Remove ±360° jumps so a path crossing the antimeridian has continuous longitudes (e.g. 179, 181)."""
+    unwrapped = [lons[0]]
+    for lon in lons[1:]:
+        unwrapped.append(lon + 360 * round((unwrapped[-1] - lon) / 360))
+    return unwrapped
+
+
+def _split_at_antimeridian(geometry, center_lon: float):
+    """
+    Re-express geometry around center_lon, then cut any part past ±180 off and
+    shift it back by 360°, so a corridor over the dateline becomes valid pieces
+    on both sides instead of a polygon wrapped the long way round the globe.
     """
+    import shapely
+    from shapely.affinity import translate
+    from shapely.geometry import box
+    from shapely.ops import unary_union
+
+    def around_center(coords):
+        coords[:, 0] = center_lon + (coords[:, 0] - center_lon + 180) % 360 - 180
+        return coords
+
+    geometry = shapely.transform(geometry, around_center)
+    min_lon, _, max_lon, _ = geometry.bounds
+    if min_lon >= -180 and max_lon <= 180:
+        return geometry
+
+    pieces = [
+        translate(geometry.intersection(box(west, -90, west + 360, 90)), xoff=-(west + 180))
+        for west in (-540, -180, 180)
+    ]
+    return unary_union([p for p in pieces if not p.is_empty])
+
+
+def _buffer_route(origin: tuple, destination: tuple, width_nm: float):
+    """Project the great circle route to meters and buffer it by width_nm."""
+    import pyproj
+    from shapely.geometry import LineString
+    from shapely.ops import transform
+
     # Convert nautical miles to meters (1nm = 1852m)
     width_m = width_nm * 1852
 
     # Draw a line between airport coords
     line = build_great_circle_line(origin, destination)
+    lons = unwrap_longitudes([lon for lon, _ in line.coords])
+    line = LineString(zip(lons, (lat for _, lat in line.coords)))
+    center_lon = (min(lons) + max(lons)) / 2
 
-    # Project to a meter-based CRS for accurate buffering
+    # Project to a meter-based CRS for accurate buffering. Web Mercator centered on the
+    # route, so routes over the antimeridian don't straddle the projection's seam
     wgs84 = pyproj.CRS("EPSG:4326")     # Standard long/lat from API
-    mercator = pyproj.CRS("EPSG:3857")  # Convert to meters in Web Mercator projection
+    mercator = pyproj.CRS.from_proj4(
+        f"+proj=merc +a=6378137 +b=6378137 +lon_0={(center_lon + 180) % 360 - 180} +units=m +no_defs"
+    )
     project = pyproj.Transformer.from_crs(wgs84, mercator, always_xy=True).transform    # Transform wgs to mercator
     rev_project = pyproj.Transformer.from_crs(mercator, wgs84, always_xy=True).transform  # Reverse transform mercator to wgs
 
@@ -82,4 +146,4 @@ def build_corridor(origin: tuple, destination: tuple, width_nm: float = Config.C
     corridor_projected = line_projected.buffer(width_m)
     corridor = transform(rev_project, corridor_projected)
 
-    return corridor
\ No newline at end of file
+    return _split_at_antimeridian(corridor, center_lon)
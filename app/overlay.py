@@ -0,0 +1,216 @@
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import Config
+from app.shared_cache import cache_set, get_or_compute
+from app.pireps import fetch_pireps, pirep_marker_color
+from app.sigmets import load_sigmets, sigmet_source
+from app.upstream import combine_sources, unavailable_source
+from app import singleflight
+
+# This worker's copy of the current national overlay dataset
+_overlay_cache = {"built_at": 0.0, "pirep_index": {}, "sigmets": [], "sources": []}
+_overlay_lock = threading.Lock()
+
+# PIREP/SIGMET properties exposed in tile features
+PIREP_PROPERTIES = ("pirepType", "acType", "fltLvl", "tbInt1", "icgInt1", "icgType1", "temp", "rawOb")
+SIGMET_PROPERTIES = ("airSigmetType", "hazard", "seriesId", "altitudeLow1", "altitudeHi1",
+                     "movementDir", "movementSpd", "validTimeTo", "rawAirSigmet")
+
+
+def tile_bounds(z: int, x: int, y: int) -> tuple:
+    """Return (min_lat, min_lon, max_lat, max_lon) of a Web Mercator z/x/y tile."""
+    n = 2 ** z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return (min_lat, min_lon, max_lat, max_lon)
+
+
+def lat_lon_to_tile(lat: float, lon: float, z: int) -> tuple:
+    """Return the (x, y) tile containing a point at zoom z."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return (min(max(x, 0), n - 1), min(max(y, 0), n - 1))
+
+
+def fetch_national_pireps() -> tuple[list[dict], dict]:
+    """
+    Fetch all current PIREPs over OVERLAY_BBOX, split into a grid of smaller
+    boxes to stay under the API's result cap on large bounding boxes.
+    Returns (pireps, freshness).
+    """
+    min_lat, min_lon, max_lat, max_lon = Config.OVERLAY_BBOX
+    rows, cols = Config.OVERLAY_FETCH_GRID
+    lat_step = (max_lat - min_lat) / rows
+    lon_step = (max_lon - min_lon) / cols
+    boxes = [
+        (min_lat + r * lat_step, min_lon + c * lon_step,
+         min_lat + (r + 1) * lat_step, min_lon + (c + 1) * lon_step)
+        for r in range(rows) for c in range(cols)
+    ]
+
+    all_pireps = []
+    seen_ids = set()
+    sources = []
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(fetch_pireps, bbox, Config.OVERLAY_LOOKBACK_HOURS) for bbox in boxes]
+        for future in as_completed(futures):
+            try:
+                pireps, source = future.result()
+            except Exception as e:
+                sources.append(unavailable_source("pirep", e))
+                continue
+            sources.append(source)
+            for p in pireps:
+                key = (p.get("receiptTime"), p.get("icaoId"), p.get("lat"), p.get("lon"))
+                if key not in seen_ids:
+                    seen_ids.add(key)
+                    all_pireps.append(p)
+    return all_pireps, combine_sources(sources)[0]
+
+
+def index_pireps(pireps: list[dict]) -> dict:
+    """Bucket PIREPs by their tile at OVERLAY_INDEX_ZOOM, dropping ACARS position reports."""
+    index = {}
+    for pirep in pireps:
+        try:
+            if pirep.get("pirepType") in ("ARP", "AIREP"):
+                continue
+            cell = lat_lon_to_tile(float(pirep["lat"]), float(pirep["lon"]), Config.OVERLAY_INDEX_ZOOM)
+        except (KeyError, TypeError, ValueError):
+            continue
+        index.setdefault(cell, []).append(pirep)
+    return index
+
+
+def _build_overlay() -> dict:
+    pireps, pirep_source = fetch_national_pireps()
+    sigmets = load_sigmets()
+    return {
+        "built_at": time.time(),
+        "pirep_index": index_pireps(pireps),
+        "sigmets": sigmets,
+        "sources": [pirep_source, sigmet_source()],
+    }
+
+
+def load_overlay(refresh: bool = False) -> dict:
+    """
+    Return the national overlay dataset, rebuilt once per OVERLAY_REFRESH_SECONDS
+    (or when refresh is True) and shared across workers.
+    """
+    with _overlay_lock:
+        age = time.time() - _overlay_cache["built_at"]
+        if not refresh and _overlay_cache["built_at"] and age < Config.OVERLAY_REFRESH_SECONDS:
+            return _overlay_cache
+
+    # Built outside the lock so tiles keep being served from the current dataset meanwhile
+    shared = singleflight.do(
+        ("overlay", refresh),
+        lambda: get_or_compute("overlay:data", Config.OVERLAY_REFRESH_SECONDS, _build_overlay, force=refresh)
+    )
+
+    with _overlay_lock:
+        if shared["built_at"] >= _overlay_cache["built_at"]:
+            _overlay_cache.update(shared)
+        return _overlay_cache
+
+
+def refresh_overlay():
+    """
+    Rebuild the overlay for the next ingest cycle and precompute its low-zoom
+    tiles over OVERLAY_BBOX. Scheduled alongside the route warmer.
+    """
+    try:
+        overlay = load_overlay(refresh=True)
+    except Exception as e:
+        print(f"Overlay rebuild failed: {e}")
+        return
+
+    min_lat, min_lon, max_lat, max_lon = Config.OVERLAY_BBOX
+    for z in range(Config.OVERLAY_PRECOMPUTE_ZOOM + 1):
+        min_x, min_y = lat_lon_to_tile(max_lat, min_lon, z)
+        max_x, max_y = lat_lon_to_tile(min_lat, max_lon, z)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                key = f"overlay_tile:{overlay['built_at']}:{z}:{x}:{y}"
+                cache_set(key, build_tile(overlay, z, x, y), Config.OVERLAY_REFRESH_SECONDS)
+
+
+def _tile_pireps(overlay: dict, z: int, x: int, y: int) -> list[dict]:
+    """Collect PIREPs inside a tile using the index instead of scanning every report."""
+    index = overlay["pirep_index"]
+    iz = Config.OVERLAY_INDEX_ZOOM
+    if z <= iz:
+        shift = iz - z
+        return [p for (cx, cy), cell in index.items() if (cx >> shift, cy >> shift) == (x, y) for p in cell]
+
+    # Deeper than the index: filter the parent cell's reports by the tile bounds
+    shift = z - iz
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+    return [
+        p for p in index.get((x >> shift, y >> shift), [])
+        if min_lat <= float(p["lat"]) < max_lat and min_lon <= float(p["lon"]) < max_lon
+    ]
+
+
+def _display_tolerance(z: int):
+    """Pick the coarsest precomputed SIGMET simplification finer than one pixel at zoom z."""
+    degrees_per_pixel = 360.0 / (256 * 2 ** z)
+    usable = [tol for tol in Config.SIGMET_SIMPLIFY_TOLERANCES if tol <= degrees_per_pixel]
+    return max(usable) if usable else None
+
+
+def build_tile(overlay: dict, z: int, x: int, y: int) -> dict:
+    """Build the GeoJSON FeatureCollection for one tile."""
+    from shapely.geometry import box, mapping
+
+    features = []
+    for p in _tile_pireps(overlay, z, x, y):
+        properties = {k: p.get(k) for k in PIREP_PROPERTIES}
+        properties.update({"kind": "pirep", "color": pirep_marker_color(p)})
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [float(p["lon"]), float(p["lat"])]},
+            "properties": properties,
+        })
+
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(z, x, y)
+    tile_box = box(min_lon, min_lat, max_lon, max_lat)
+    tolerance = _display_tolerance(z)
+    for entry in overlay["sigmets"]:
+        if not tile_box.intersects(entry["geometry"]):
+            continue
+        geometry = entry["simplified"].get(tolerance, entry["geometry"])
+        # Clip to the tile so each tile only carries its own share of large advisories
+        clipped = geometry.intersection(tile_box)
+        if clipped.is_empty:
+            continue
+        properties = {k: entry["sigmet"].get(k) for k in SIGMET_PROPERTIES}
+        properties["kind"] = "sigmet"
+        features.append({"type": "Feature", "geometry": mapping(clipped), "properties": properties})
+
+    return {
+        "type": "FeatureCollection",
+        "built_at": overlay["built_at"],
+        "features": features,
+        "sources": overlay.get("sources", []),
+    }
+
+
+def get_tile(z: int, x: int, y: int) -> dict:
+    """
+    Return the GeoJSON tile for z/x/y from the current overlay cycle.
+    Tiles are built once per cycle and then served from the shared cache.
+    """
+    overlay = load_overlay()
+    key = f"overlay_tile:{overlay['built_at']}:{z}:{x}:{y}"
+    return singleflight.do(
+        key,
+        lambda: get_or_compute(key, Config.OVERLAY_REFRESH_SECONDS, lambda: build_tile(overlay, z, x, y))
+    )
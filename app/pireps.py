@@ -1,35 +1,32 @@
-import requests
-from shapely.geometry import Point
 from config import Config
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from app.corridor import build_corridor, compute_bbox, build_great_circle_line, calculate_distance_nm
+from app.shared_cache import get_or_compute
+from app import singleflight
+from app.upstream import upstream_get, combine_sources, unavailable_source, UpstreamUnavailable
 
 
-def fetch_pireps(bbox: tuple, lookback_hours: int = None) -> list[dict]:
+def fetch_pireps(bbox: tuple, lookback_hours: int = None) -> tuple[list[dict], dict]:
     """
     Fetch all recent PIREPs from AviationWeather.gov.
     bbox is (min_lat, min_lon, max_lat, max_lon)
+    Returns (pireps, freshness).
     """
-    url = f"{Config.AVIATIONWEATHER_BASE_URL}/pirep"
     params = {
         "format": "json",
         "age": lookback_hours or Config.PIREP_LOOKBACK_HOURS_SHORT,
         "level": Config.PIREP_ALTITUDE_LEVEL,
         "bbox": f"{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
     }
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
+    return upstream_get("pirep", params)
 
-    if not response.text.strip():
-        return []
 
-    return response.json()
-
-
-def fetch_pireps_for_route(origin_coords: tuple, destination_coords: tuple, lookback_hours: int) -> list[dict]:
+def fetch_pireps_for_route(origin_coords: tuple, destination_coords: tuple, lookback_hours: int) -> tuple[list[dict], dict]:
     """
     Split long routes into segments and fetch PIREPs for each,
     avoiding the API's 400 result cap on large bounding boxes.
+    Returns (pireps, freshness); segments that could not be fetched at all
+    leave the result marked partial rather than failing the route.
     """
     distance_nm = calculate_distance_nm(origin_coords, destination_coords)
 
@@ -38,7 +35,10 @@ def fetch_pireps_for_route(origin_coords: tuple, destination_coords: tuple, look
 
     if num_segments == 1:
         bbox = compute_bbox(origin_coords, destination_coords)
-        return fetch_pireps(bbox, lookback_hours=lookback_hours)
+        try:
+            return fetch_pireps(bbox, lookback_hours=lookback_hours)
+        except UpstreamUnavailable as e:
+            return [], unavailable_source("pirep", e)
 
     # Generate segment waypoints along the great circle
     line = build_great_circle_line(origin_coords, destination_coords)
@@ -63,24 +63,28 @@ def fetch_pireps_for_route(origin_coords: tuple, destination_coords: tuple, look
 
     all_pireps = []
     seen_ids = set()
+    sources = []
 
     with ThreadPoolExecutor(max_workers=5) as executor:
         futures = {executor.submit(fetch_segment, i): i for i in range(num_segments)}
         for future in as_completed(futures):
             try:
-                segment_pireps = future.result()
-                for p in segment_pireps:
-                    key = (p.get("receiptTime"), p.get("icaoId"))
-                    if key not in seen_ids:
-                        seen_ids.add(key)
-                        all_pireps.append(p)
-            except Exception:
+                segment_pireps, source = future.result()
+            except Exception as e:
+                sources.append(unavailable_source("pirep", e))
                 continue
+            sources.append(source)
+            for p in segment_pireps:
+                key = (p.get("receiptTime"), p.get("icaoId"))
+                if key not in seen_ids:
+                    seen_ids.add(key)
+                    all_pireps.append(p)
 
-    return all_pireps
+    return all_pireps, combine_sources(sources)[0]
 
 
 def filter_pireps_by_corridor(pireps: list[dict], corridor) -> list[dict]:
+    from shapely.geometry import Point
     filtered = []
     for pirep in pireps:
         try:
@@ -98,11 +102,59 @@ def filter_pireps_by_corridor(pireps: list[dict], corridor) -> list[dict]:
     return filtered
 
 
-def get_route_pireps(origin_icao: str, destination_icao: str, airport_coords: dict) -> list[dict]:
+def pirep_marker_color(pirep: dict) -> str:
+    """Return a color based on the most significant condition reported."""
+    if pirep.get("pirepType") == "ARP":
+        return "#aa00ff"  # Purple for strong wind ACARS reports
+
+    turb = pirep.get("tbInt1", "")
+    ice = pirep.get("icgInt1", "")
+
+    if turb in ("SEV", "EXTRM"):
+        return "#ff0000"   # Red — severe turbulence
+    if turb in ("MOD", "MOD-SEV"):
+        return "#ff6b00"   # Orange — moderate turbulence
+    if ice in ("SEV", "HVY"):
+        return "#ff0000"   # Red — severe icing
+    if ice in ("MOD",):
+        return "#00aaff"   # Blue — moderate icing
+    if turb in ("LGT", "LGT-MOD"):
+        return "#ffff00"   # Yellow — light turbulence
+    return "#00ff88"       # Green — nothing significant
+
+
+def get_route_pireps(origin_icao: str, destination_icao: str, airport_coords: dict, refresh: bool = False) -> tuple[list[dict], dict]:
     """
-    Master function: given two ICAO codes, return filtered PIREPs along the route.
+    Master function: given two ICAO codes, return (filtered PIREPs along the route, freshness).
     airport_coords should be a dict like {"KORD": (41.97, -87.90), "KDEN": (39.85, -104.67)}
+    Results are served from the host-wide shared cache unless stale; refresh rebuilds
+    them, still computing once per host. The freshness is cached with the PIREPs,
+    so it describes how the served briefing was built, whichever worker built it.
+    Concurrent identical requests share a single computation.
     """
+    return singleflight.do(
+        ("route_pireps", origin_icao, destination_icao, refresh),
+        lambda: _get_route_pireps(origin_icao, destination_icao, airport_coords, refresh)
+    )
+
+
+def _get_route_pireps(origin_icao: str, destination_icao: str, airport_coords: dict, refresh: bool) -> tuple[list[dict], dict]:
+    return get_or_compute(
+        f"route_pireps:{origin_icao}:{destination_icao}",
+        _route_cache_seconds,
+        lambda: build_route_pireps(origin_icao, destination_icao, airport_coords),
+        force=refresh
+    )
+
+
+def _route_cache_seconds(briefing: tuple[list[dict], dict]) -> float:
+    """Keep a stale or partial briefing only briefly, so a recovered upstream is picked up soon."""
+    _, source = briefing
+    return Config.ROUTE_CACHE_SECONDS if source["status"] == "ok" else Config.ROUTE_DEGRADED_CACHE_SECONDS
+
+
+def build_route_pireps(origin_icao: str, destination_icao: str, airport_coords: dict) -> tuple[list[dict], dict]:
+    """Run the full fetch + corridor + filter pipeline for a route, bypassing the cache. Returns (pireps, freshness)."""
     origin_coords = airport_coords.get(origin_icao)
     destination_coords = airport_coords.get(destination_icao)
 
@@ -113,6 +165,6 @@ def get_route_pireps(origin_icao: str, destination_icao: str, airport_coords: di
     distance_nm = calculate_distance_nm(origin_coords, destination_coords)
     lookback = Config.PIREP_LOOKBACK_HOURS_LONG if distance_nm > Config.MD_DISTANCE else Config.PIREP_LOOKBACK_HOURS_MED if distance_nm > Config.SH_DISTANCE else Config.PIREP_LOOKBACK_HOURS_SHORT
 
-    all_pireps = fetch_pireps_for_route(origin_coords, destination_coords, lookback_hours=lookback)
+    all_pireps, source = fetch_pireps_for_route(origin_coords, destination_coords, lookback_hours=lookback)
     corridor = build_corridor(origin_coords, destination_coords)
-    return filter_pireps_by_corridor(all_pireps, corridor)
\ No newline at end of file
+    return filter_pireps_by_corridor(all_pireps, corridor), source
\ No newline at end of file
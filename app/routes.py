@@ -1,10 +1,23 @@
-from flask import Blueprint, request, jsonify, render_template
-from app.atis import check_for_atis_change
-from app.airports import get_airport, get_coords
-from app.pireps import get_route_pireps
-from app.sigmets import get_route_sigmets, parse_sigmet_polygon
+import csv
+import io
+import json
+from flask import Blueprint, request, jsonify, render_template, current_app, Response, stream_with_context
+from app.atis import (
+    check_for_atis_change,
+    get_atis_history,
+    iter_atis_history,
+    normalize_timestamp,
+    decode_history_cursor,
+    HISTORY_COLUMNS,
+)
+from app.airports import get_airport, get_coords, airports_status, search_airports, nearby_airports, airports_along_route
+from app.pireps import get_route_pireps, pirep_marker_color
+from app.sigmets import get_route_sigmets, get_route_sigmet_entries, display_locations, sigmet_source
 from app.corridor import build_great_circle_line
-import folium
+from app.warmer import record_route_request
+from app.overlay import get_tile
+from app.upstream import describe_sources
+from config import Config
 
 main = Blueprint("main", __name__)
 
@@ -14,6 +27,17 @@ def index():
     return render_template("index.html")
 
 
+@main.route("/api/ready")
+def ready():
+    """
+    GET /api/ready
+    Readiness probe: 200 once the airport database is loaded, 503 until then.
+    """
+    status = airports_status()
+    status["startup_seconds"] = current_app.config.get("STARTUP_SECONDS")
+    return jsonify(status), 200 if status["ready"] else 503
+
+
 @main.route("/api/pireps")
 def pireps():
     """
@@ -34,17 +58,99 @@ def pireps():
     if not destination_coords:
         return jsonify({"error": f"Airport not found: {destination}"}), 404
 
+    # Dashboard refreshes always hit this endpoint, so it alone feeds route popularity
+    record_route_request(origin, destination)
+
     airport_coords = {origin: origin_coords, destination: destination_coords}
-    results = get_route_pireps(origin, destination, airport_coords)
+    results, source = get_route_pireps(origin, destination, airport_coords)
 
     return jsonify({
         "origin": origin,
         "destination": destination,
         "count": len(results),
-        "pireps": results
+        "pireps": results,
+        "sources": describe_sources([source]),
     })
 
 
+def _result_limit(default: int = 10) -> int:
+    """Read ?limit=, clamped to AIRPORT_SEARCH_MAX_RESULTS."""
+    limit = request.args.get("limit", default, type=int)
+    return max(1, min(limit, Config.AIRPORT_SEARCH_MAX_RESULTS))
+
+
+@main.route("/api/airports/search")
+def airports_search():
+    """
+    GET /api/airports/search?q=ohare&limit=10
+    Returns airports matching an ident prefix or name.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+
+    results = search_airports(query, limit=_result_limit())
+    return jsonify({"query": query, "count": len(results), "airports": results})
+
+
+@main.route("/api/airports/nearby")
+def airports_nearby():
+    """
+    GET /api/airports/nearby?lat=41.97&lon=-87.90&radius_nm=50
+    GET /api/airports/nearby?airport=KORD&radius_nm=50
+    GET /api/airports/nearby?origin=KORD&destination=KDEN&offset=0&limit=500
+    Returns airports near a point or airport (nearest first), or inside a route
+    corridor ordered from origin to destination. Corridor results are paged;
+    pass the returned next_offset as ?offset= to get the following page.
+    """
+    origin = request.args.get("origin", "").upper()
+    destination = request.args.get("destination", "").upper()
+    if origin or destination:
+        if not origin or not destination:
+            return jsonify({"error": "origin and destination are required"}), 400
+        origin_coords = get_coords(origin)
+        destination_coords = get_coords(destination)
+        if not origin_coords:
+            return jsonify({"error": f"Airport not found: {origin}"}), 404
+        if not destination_coords:
+            return jsonify({"error": f"Airport not found: {destination}"}), 404
+        hits = airports_along_route(origin_coords, destination_coords)
+
+        offset = max(0, request.args.get("offset", 0, type=int))
+        limit = request.args.get("limit", Config.AIRPORT_CORRIDOR_MAX_PAGE, type=int)
+        limit = max(1, min(limit, Config.AIRPORT_CORRIDOR_MAX_PAGE))
+        results = list(hits[offset:offset + limit])
+        return jsonify({
+            "origin": origin,
+            "destination": destination,
+            "total": len(hits),
+            "count": len(results),
+            "airports": results,
+            "next_offset": offset + limit if offset + limit < len(hits) else None,
+        })
+
+    airport = request.args.get("airport", "").upper()
+    if airport:
+        coords = get_coords(airport)
+        if not coords:
+            return jsonify({"error": f"Airport not found: {airport}"}), 404
+        lat, lon = coords
+    else:
+        lat = request.args.get("lat", type=float)
+        lon = request.args.get("lon", type=float)
+        if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+            return jsonify({"error": "lat and lon (or airport, or origin and destination) are required"}), 400
+
+    radius_nm = request.args.get("radius_nm", Config.AIRPORT_NEARBY_RADIUS_NM, type=float)
+    if not radius_nm > 0:
+        return jsonify({"error": "radius_nm must be positive"}), 400
+    # A huge radius scans every grid cell on the globe, so cap it like ?limit=
+    radius_nm = min(radius_nm, Config.AIRPORT_NEARBY_MAX_RADIUS_NM)
+
+    results = nearby_airports(lat, lon, radius_nm=radius_nm, limit=_result_limit())
+    return jsonify({"lat": lat, "lon": lon, "radius_nm": radius_nm, "count": len(results), "airports": results})
+
+
 @main.route("/api/atis")
 def atis():
     """
@@ -57,35 +163,94 @@ def atis():
 
     icao_list = [a.strip().upper() for a in airports_param.split(",")]
     results = []
+    sources = []
     for icao in icao_list:
         airport = get_airport(icao)
         if not airport:
             results.append({"airport": icao, "error": "Airport not found"})
             continue
         status = check_for_atis_change(icao)
-        results.append(status)
+        sources.append(status.get("source"))
+        results.append({k: v for k, v in status.items() if k != "source"})
 
-    return jsonify({"airports": results})
+    return jsonify({"airports": results, "sources": describe_sources(sources)})
 
-def pirep_marker_color(pirep: dict) -> str:
-    """Return a color based on the most significant condition reported."""
-    if pirep.get("pirepType") == "ARP":
-        return "#aa00ff"  # Purple for strong wind ACARS reports
+def _history_filters() -> tuple:
+    """Parse ?airports=&start=&end= for the history endpoints. Raises ValueError on bad input."""
+    airports_param = request.args.get("airports", "")
+    airports = [a.strip().upper() for a in airports_param.split(",") if a.strip()] or None
+    start = request.args.get("start")
+    end = request.args.get("end")
+    try:
+        start = normalize_timestamp(start) if start else None
+        end = normalize_timestamp(end) if end else None
+    except ValueError:
+        raise ValueError("start and end must be ISO 8601 times")
+    return airports, start, end
 
-    turb = pirep.get("tbInt1", "")
-    ice = pirep.get("icgInt1", "")
 
-    if turb in ("SEV", "EXTRM"):
-        return "#ff0000"   # Red — severe turbulence
-    if turb in ("MOD", "MOD-SEV"):
-        return "#ff6b00"   # Orange — moderate turbulence
-    if ice in ("SEV", "HVY"):
-        return "#ff0000"   # Red — severe icing
-    if ice in ("MOD",):
-        return "#00aaff"   # Blue — moderate icing
-    if turb in ("LGT", "LGT-MOD"):
-        return "#ffff00"   # Yellow — light turbulence
-    return "#00ff88"       # Green — nothing significant
+@main.route("/api/atis/history")
+def atis_history():
+    """
+    GET /api/atis/history?airports=KORD,KDEN&start=2026-10-18T00:00Z&end=2026-10-19T00:00Z&limit=100
+    Returns stored ATIS observations ordered by airport then time, or by time
+    alone when no airports are given. Pass the returned next_cursor as ?cursor=
+    with the same filters to get the following page.
+    """
+    limit = request.args.get("limit", 100, type=int)
+    limit = max(1, min(limit, Config.ATIS_HISTORY_MAX_PAGE))
+
+    try:
+        airports, start, end = _history_filters()
+        cursor = request.args.get("cursor")
+        after = decode_history_cursor(cursor) if cursor else None
+        rows, next_cursor = get_atis_history(airports, start, end, after=after, limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "count": len(rows),
+        "observations": rows,
+        "next_cursor": next_cursor,
+    })
+
+
+@main.route("/api/atis/history/export")
+def atis_history_export():
+    """
+    GET /api/atis/history/export?airports=KORD&start=...&end=...&format=ndjson|csv
+    Streams every matching observation without loading the result set into memory.
+    """
+    try:
+        airports, start, end = _history_filters()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    export_format = request.args.get("format", "ndjson").lower()
+    rows = iter_atis_history(airports, start, end)
+
+    if export_format == "ndjson":
+        body = (json.dumps(row) + "\n" for row in rows)
+        mimetype = "application/x-ndjson"
+    elif export_format == "csv":
+        def csv_lines():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(HISTORY_COLUMNS)
+            for row in rows:
+                writer.writerow([row[c] for c in HISTORY_COLUMNS])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()  # Header only, when nothing matched
+        body = csv_lines()
+        mimetype = "text/csv"
+    else:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=atis_history.{export_format}"
+    return response
 
 
 def build_pirep_tooltip(pirep: dict) -> str:
@@ -111,6 +276,10 @@ def build_pirep_tooltip(pirep: dict) -> str:
 
 @main.route("/api/map")
 def map_view():
+    import folium  # Heavy; only loaded once the map is first requested
+    from branca.element import MacroElement
+    from jinja2 import Template
+
     origin = request.args.get("origin", "").upper()
     destination = request.args.get("destination", "").upper()
 
@@ -137,7 +306,7 @@ def map_view():
     # PIREPs
     try:
         airport_coords = {origin: origin_coords, destination: destination_coords}
-        pireps = get_route_pireps(origin, destination, airport_coords)
+        pireps, _ = get_route_pireps(origin, destination, airport_coords)
         for p in pireps:
             color = pirep_marker_color(p)
             tooltip = build_pirep_tooltip(p)
@@ -165,33 +334,31 @@ def map_view():
 
     # SIGMETs
     try:
-        sigmets = get_route_sigmets(origin_coords, destination_coords)
-        for s in sigmets:
-            polygon = parse_sigmet_polygon(s)
-            if not polygon:
-                continue
+        entries = get_route_sigmet_entries(origin_coords, destination_coords)
+        for entry in entries:
+            s = entry["sigmet"]
             hazard = s.get("hazard", "")
             color = "#ff0000" if hazard == "CONVECTIVE" else \
                 "#00aaff" if hazard == "ICING" else "#ff6b00"
-            coords = [[c["lat"], c["lon"]] for c in s.get("coords", [])]
-            folium.Polygon(
-                locations=coords,
-                color=color,
-                fill=True,
-                fill_color=color,
-                fill_opacity=0.2,
-                weight=2,
-                tooltip=folium.Tooltip(
-                    f"<div style='font-family:monospace;font-size:12px;'>"
-                    f"<div style='color:#00d4ff'>{s.get('airSigmetType')} — {hazard}</div>"
-                    f"<div>Series: {s.get('seriesId', '?')}</div>"
-                    f"<div>Tops: FL{str(s.get('altitudeHi1', 0) // 100).zfill(3)}</div>"
-                    f"<div>Movement: {s.get('movementDir', '?')}° at {s.get('movementSpd', '?')}kt</div>"
-                    f"</div>",
-                    sticky=True,
-                    direction="top"
-                )
-            ).add_to(m)
+            for coords in display_locations(entry):
+                folium.Polygon(
+                    locations=coords,
+                    color=color,
+                    fill=True,
+                    fill_color=color,
+                    fill_opacity=0.2,
+                    weight=2,
+                    tooltip=folium.Tooltip(
+                        f"<div style='font-family:monospace;font-size:12px;'>"
+                        f"<div style='color:#00d4ff'>{s.get('airSigmetType')} — {hazard}</div>"
+                        f"<div>Series: {s.get('seriesId', '?')}</div>"
+                        f"<div>Tops: FL{str(s.get('altitudeHi1', 0) // 100).zfill(3)}</div>"
+                        f"<div>Movement: {s.get('movementDir', '?')}° at {s.get('movementSpd', '?')}kt</div>"
+                        f"</div>",
+                        sticky=True,
+                        direction="top"
+                    )
+                ).add_to(m)
     except Exception:
         pass
 
@@ -254,8 +421,98 @@ def map_view():
         """
     m.get_root().html.add_child(folium.Element(legend_html))
 
+    # National overlay: fetch visible z/x/y tiles as the map pans so weather
+    # outside the corridor shows up without re-running the route pipeline.
+    # Absolute URL because the map is rendered inside a blob: iframe.
+    overlay_js = """
+        (function() {
+            var map = %(map)s;
+            var tileUrl = "%(url)s";
+            var maxZoom = %(max_zoom)d;
+            var layer = L.layerGroup().addTo(map);
+            var loaded = {};
+            var loadedZoom = null;
+
+            function sigmetColor(hazard) {
+                return hazard === "CONVECTIVE" ? "#ff0000" : hazard === "ICING" ? "#00aaff" : "#ff6b00";
+            }
+
+            function addTile(data) {
+                L.geoJSON(data, {
+                    pointToLayer: function(feature, latlng) {
+                        var c = feature.properties.color;
+                        return L.circleMarker(latlng, {radius: 4, color: c, fillColor: c, fillOpacity: 0.4, weight: 1});
+                    },
+                    style: function(feature) {
+                        var c = sigmetColor(feature.properties.hazard);
+                        return {color: c, weight: 1, fillOpacity: 0.08, dashArray: "4"};
+                    },
+                    onEachFeature: function(feature, l) {
+                        var p = feature.properties;
+                        l.bindTooltip("<div style='font-family:monospace;font-size:11px;'>" +
+                            (p.kind === "pirep" ? (p.rawOb || "") : (p.airSigmetType + " — " + p.hazard)) + "</div>");
+                    }
+                }).addTo(layer);
+            }
+
+            function refresh() {
+                var z = Math.min(map.getZoom(), maxZoom);
+                if (z !== loadedZoom) {
+                    layer.clearLayers();
+                    loaded = {};
+                    loadedZoom = z;
+                }
+                var b = map.getPixelBounds();
+                var scale = Math.pow(2, z - map.getZoom()) / 256;
+                var n = Math.pow(2, z);
+                for (var x = Math.floor(b.min.x * scale); x <= Math.floor(b.max.x * scale); x++) {
+                    for (var y = Math.max(0, Math.floor(b.min.y * scale)); y <= Math.min(n - 1, Math.floor(b.max.y * scale)); y++) {
+                        var tx = ((x %% n) + n) %% n;
+                        var key = z + "/" + tx + "/" + y;
+                        if (loaded[key]) continue;
+                        loaded[key] = true;
+                        fetch(tileUrl.replace("{z}", z).replace("{x}", tx).replace("{y}", y))
+                            .then(function(r) { return r.ok ? r.json() : null; })
+                            .then(function(data) { if (data) addTile(data); })
+                            .catch(function() {});
+                    }
+                }
+            }
+
+            map.on("moveend", refresh);
+            refresh();
+        })();
+    """ % {
+        "map": m.get_name(),
+        "url": request.host_url + "api/overlay/{z}/{x}/{y}",
+        "max_zoom": Config.OVERLAY_MAX_ZOOM,
+    }
+    # Attached to the map (not the page root) so it renders after the map is defined
+    overlay = MacroElement()
+    overlay._template = Template("{% macro script(this, kwargs) %}" + overlay_js + "{% endmacro %}")
+    m.add_child(overlay)
+
     return m._repr_html_()
 
+
+@main.route("/api/overlay/<int:z>/<int:x>/<int:y>")
+def overlay_tile(z, x, y):
+    """
+    GET /api/overlay/5/7/11
+    Returns a GeoJSON tile of all current PIREPs and SIGMETs, rebuilt once per ingest cycle.
+    """
+    if z > Config.OVERLAY_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return jsonify({"error": "Tile out of range"}), 400
+
+    try:
+        tile = get_tile(z, x, y)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    response = jsonify(dict(tile, sources=describe_sources(tile["sources"])))
+    response.headers["Cache-Control"] = f"public, max-age={Config.OVERLAY_TILE_MAX_AGE_SECONDS}"
+    return response
+
 from app.sigmets import get_route_sigmets
 
 @main.route("/api/sigmets")
@@ -284,7 +541,8 @@ def sigmets():
             "origin": origin,
             "destination": destination,
             "count": len(results),
-            "sigmets": results
+            "sigmets": results,
+            "sources": describe_sources([sigmet_source()]),
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -0,0 +1,212 @@
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+from config import Config
+
+# One connection per (process, thread, db path); sqlite connections must not cross forks
+_local = threading.local()
+_MISSING = object()
+
+
+def _connect() -> sqlite3.Connection:
+    """Return this thread's connection to the host-wide cache database."""
+    path = Config.SHARED_CACHE_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = (os.getpid(), path)
+    conn = conns.get(key)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=Config.SHARED_CACHE_LEASE_SECONDS, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")      # Readers never block the writer
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conns[key] = conn
+    return conn
+
+
+@contextmanager
+def _write_transaction():
+    """Hold the database write lock for the duration of the block, committing on success."""
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _owner() -> str:
+    return f"{os.getpid()}-{threading.get_ident()}"
+
+
+def cache_get(key: str, default=None, newer_than: float = 0.0):
+    """Return the cached value for key, or default if missing, expired or stored before newer_than."""
+    try:
+        row = _connect().execute(
+            "SELECT value, stored_at, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+    except sqlite3.Error:
+        return default
+    if not row or row[2] <= time.time() or row[1] < newer_than:
+        return default
+    return pickle.loads(row[0])
+
+
+def _evict(conn: sqlite3.Connection, now: float):
+    """Drop expired entries, then the oldest entries until under SHARED_CACHE_MAX_BYTES."""
+    conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+    excess = total - Config.SHARED_CACHE_MAX_BYTES
+    if excess <= 0:
+        return
+    victims = []
+    for key, size in conn.execute("SELECT key, size FROM cache ORDER BY stored_at"):
+        victims.append((key,))
+        excess -= size
+        if excess <= 0:
+            break
+    conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+
+def cache_set(key: str, value, ttl: float):
+    """Atomically store value under key for ttl seconds."""
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    now = time.time()
+    try:
+        with _write_transaction() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO cache (key, value, size, stored_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, blob, len(blob), now, now + ttl))
+            _evict(conn, now)
+    except sqlite3.Error:
+        pass  # A failed cache write should never fail the request
+
+
+def cache_update(key: str, ttl: float, update):
+    """
+    Atomically replace the value under key with update(current) and return it.
+    current is None when the key is missing or expired. Concurrent updates from
+    any worker are serialized, so none are lost. If the cache is unavailable,
+    update(None) is returned without being stored.
+    """
+    try:
+        with _write_transaction() as conn:
+            now = time.time()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            current = pickle.loads(row[0]) if row and row[1] > now else None
+            value = update(current)
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            conn.execute("""
+                INSERT OR REPLACE INTO cache (key, value, size, stored_at, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, blob, len(blob), now, now + ttl))
+            _evict(conn, now)
+        return value
+    except sqlite3.Error:
+        return update(None)
+
+
+def _acquire_lease(key: str, lease_seconds: float) -> bool:
+    """Try to become the single writer for key. Stale leases from dead workers are reclaimed."""
+    now = time.time()
+    try:
+        with _write_transaction() as conn:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, _owner(), now + lease_seconds)
+            )
+        return cursor.rowcount == 1
+    except sqlite3.Error:
+        return True  # Cache unavailable: just compute locally
+
+
+def _release_lease(key: str):
+    try:
+        _connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, _owner()))
+    except sqlite3.Error:
+        pass
+
+
+def try_claim(key: str, seconds: float) -> bool:
+    """
+    Claim key for this worker process for the next seconds, host-wide.
+    The holder renews its own claim, so a periodic job guarded by it keeps
+    running on one worker; another takes over once a dead holder's claim expires.
+    """
+    now = time.time()
+    owner = str(os.getpid())
+    try:
+        with _write_transaction() as conn:
+            conn.execute(
+                "DELETE FROM leases WHERE key = ? AND (expires_at <= ? OR owner = ?)",
+                (f"claim:{key}", now, owner)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (f"claim:{key}", owner, now + seconds)
+            )
+        return cursor.rowcount == 1
+    except sqlite3.Error:
+        return True  # Cache unavailable: every worker runs the job as before
+
+
+def get_or_compute(key: str, ttl: float, compute, lease_seconds: float = None, force: bool = False):
+    """
+    Return the cached value for key, computing and storing it on a miss.
+    Only one worker on the host computes a given key at a time; the others
+    wait for its result, falling back to computing themselves after lease_seconds.
+    With force, any value cached before the call is treated as a miss, so a
+    refresh still runs once per host and concurrent refreshers share its result.
+    ttl may also be a function of the computed value, for results that should expire sooner.
+    """
+    newer_than = time.time() if force else 0.0
+    value = cache_get(key, _MISSING, newer_than)
+    if value is not _MISSING:
+        return value
+
+    lease_seconds = lease_seconds or Config.SHARED_CACHE_LEASE_SECONDS
+    deadline = time.monotonic() + lease_seconds
+    while True:
+        if _acquire_lease(key, lease_seconds):
+            try:
+                # Another writer may have finished between our miss and the lease
+                value = cache_get(key, _MISSING, newer_than)
+                if value is _MISSING:
+                    value = compute()
+                    cache_set(key, value, ttl(value) if callable(ttl) else ttl)
+                return value
+            finally:
+                _release_lease(key)
+
+        time.sleep(Config.SHARED_CACHE_POLL_SECONDS)
+        value = cache_get(key, _MISSING, newer_than)
+        if value is not _MISSING:
+            return value
+        if time.monotonic() >= deadline:
+            return compute()
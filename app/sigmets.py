@@ -1,17 +1,23 @@
-import requests
-from shapely.geometry import Point, Polygon, MultiPolygon
+import time
+import threading
 from config import Config
+from app.shared_cache import get_or_compute
+from app import singleflight
+from app.upstream import upstream_get
 
+# shapely is imported inside the functions that need it to keep app startup fast
 
-def fetch_sigmets() -> list[dict]:
-    """Fetch all active SIGMETs and AIRMETs from AviationWeather.gov."""
-    url = f"{Config.AVIATIONWEATHER_BASE_URL}/airsigmet"
+# This worker's copy of the host-wide parsed SIGMET set
+_sigmet_cache = {"fetched_at": 0.0, "entries": [], "source": None}
+_sigmet_lock = threading.Lock()
+
+
+def fetch_sigmets() -> tuple[list[dict], dict]:
+    """Fetch all active SIGMETs and AIRMETs from AviationWeather.gov. Returns (sigmets, freshness)."""
     params = {
         "format": "json",
     }
-    response = requests.get(url, params=params, timeout=10)
-    response.raise_for_status()
-    return response.json()
+    return upstream_get("airsigmet", params)
 
 
 def parse_sigmet_polygon(sigmet: dict):
@@ -19,6 +25,7 @@ def parse_sigmet_polygon(sigmet: dict):
     Extract a Shapely polygon from a SIGMET's coordinate data.
     Returns a Polygon or None if coordinates are missing/invalid.
     """
+    from shapely.geometry import Polygon
     try:
         coords = sigmet.get("coords", [])
         if not coords or len(coords) < 3:
@@ -29,21 +36,147 @@ def parse_sigmet_polygon(sigmet: dict):
         return None
 
 
+def repair_polygon(polygon):
+    """
+    Return a valid polygonal geometry covering the same area as polygon.
+    Self-intersecting advisories (e.g. bow-ties) are split into a MultiPolygon
+    rather than dropped. Returns None if nothing polygonal survives.
+    """
+    from shapely import make_valid
+    from shapely.geometry import Polygon, MultiPolygon, GeometryCollection
+
+    if polygon is None or polygon.is_empty:
+        return None
+    if polygon.is_valid:
+        return polygon
+
+    repaired = make_valid(polygon)
+
+    # make_valid can hand back collapsed lines/points alongside the polygons
+    if isinstance(repaired, GeometryCollection):
+        parts = [g for g in repaired.geoms if isinstance(g, (Polygon, MultiPolygon))]
+        polygons = []
+        for part in parts:
+            polygons.extend(part.geoms if isinstance(part, MultiPolygon) else [part])
+        repaired = MultiPolygon(polygons) if polygons else None
+    elif not isinstance(repaired, (Polygon, MultiPolygon)):
+        repaired = None
+
+    # Last resort for anything make_valid couldn't turn into area
+    if repaired is None or repaired.is_empty:
+        repaired = polygon.buffer(0)
+        if repaired.is_empty:
+            return None
+    return repaired
+
+
+def simplify_geometry(geometry, tolerances=None) -> dict:
+    """
+    Precompute topology-preserving simplifications of geometry for display.
+    Returns a dict of {tolerance_deg: geometry}.
+    """
+    tolerances = tolerances or Config.SIGMET_SIMPLIFY_TOLERANCES
+    return {tol: geometry.simplify(tol, preserve_topology=True) for tol in tolerances}
+
+
+def prepare_sigmets(sigmets: list[dict]) -> list[dict]:
+    """
+    Parse, repair and simplify raw SIGMETs once.
+    Each entry is {"sigmet": raw dict, "geometry": valid geometry, "simplified": {tol: geometry}}.
+    """
+    entries = []
+    for sigmet in sigmets:
+        geometry = repair_polygon(parse_sigmet_polygon(sigmet))
+        if geometry is None:
+            continue
+        entries.append({
+            "sigmet": sigmet,
+            "geometry": geometry,
+            "simplified": simplify_geometry(geometry),
+        })
+    return entries
+
+
+def load_sigmets(refresh: bool = False) -> list[dict]:
+    """
+    Return the prepared SIGMET set, refetching once it is older than
+    SIGMET_REFRESH_SECONDS or when refresh is True. An empty set is still a
+    valid result, so quiet periods are cached like any other.
+    """
+    with _sigmet_lock:
+        age = time.time() - _sigmet_cache["fetched_at"]
+        if not refresh and _sigmet_cache["fetched_at"] and age < Config.SIGMET_REFRESH_SECONDS:
+            return _sigmet_cache["entries"]
+
+    # Fetched and parsed outside the lock so readers keep the current set meanwhile.
+    # Parsed once per host; other workers pick up the shared result
+    shared = singleflight.do(
+        ("sigmets", refresh),
+        lambda: get_or_compute(
+            "sigmets:prepared", Config.SIGMET_REFRESH_SECONDS, _build_sigmet_set, force=refresh
+        )
+    )
+
+    with _sigmet_lock:
+        # Never swap an older set over a newer one from a concurrent refresh
+        if shared["fetched_at"] >= _sigmet_cache["fetched_at"]:
+            _sigmet_cache.update(shared)
+        return _sigmet_cache["entries"]
+
+
+def _build_sigmet_set() -> dict:
+    sigmets, source = fetch_sigmets()
+    return {"entries": prepare_sigmets(sigmets), "fetched_at": time.time(), "source": source}
+
+
+def sigmet_source() -> dict | None:
+    """Freshness of the SIGMET set load_sigmets is currently serving."""
+    with _sigmet_lock:
+        return _sigmet_cache["source"]
+
+
+def display_locations(entry: dict, tolerance: float = None) -> list[list]:
+    """
+    Return folium-ready [[lat, lon], ...] rings for a prepared SIGMET,
+    one ring per polygon part, using the simplified geometry at tolerance.
+    """
+    from shapely.geometry import MultiPolygon
+    tolerance = tolerance if tolerance is not None else Config.SIGMET_DISPLAY_TOLERANCE
+    geometry = entry["simplified"].get(tolerance, entry["geometry"])
+    polygons = geometry.geoms if isinstance(geometry, MultiPolygon) else [geometry]
+    return [[[lat, lon] for lon, lat in poly.exterior.coords] for poly in polygons]
+
+
+def filter_sigmet_entries(entries: list[dict], corridor) -> list[dict]:
+    """Return only prepared SIGMETs whose repaired geometry intersects the route corridor."""
+    return [e for e in entries if corridor.intersects(e["geometry"])]
+
+
 def filter_sigmets_by_corridor(sigmets: list[dict], corridor) -> list[dict]:
     """Return only SIGMETs whose polygon intersects the route corridor."""
-    filtered = []
-    for sigmet in sigmets:
-        polygon = parse_sigmet_polygon(sigmet)
-        if polygon and polygon.is_valid and corridor.intersects(polygon):
-            filtered.append(sigmet)
-    return filtered
+    return [e["sigmet"] for e in filter_sigmet_entries(prepare_sigmets(sigmets), corridor)]
 
 
-def get_route_sigmets(origin_coords: tuple, destination_coords: tuple) -> list[dict]:
+def get_route_sigmet_entries(origin_coords: tuple, destination_coords: tuple) -> list[dict]:
     """
-    Master function: return SIGMETs and AIRMETs that intersect the route corridor.
+    Return prepared SIGMET entries (with geometry) that intersect the route corridor.
+    Concurrent identical requests share a single computation.
     """
+    return singleflight.do(
+        ("route_sigmets", origin_coords, destination_coords),
+        lambda: _route_sigmet_entries(origin_coords, destination_coords)
+    )
+
+
+def _route_sigmet_entries(origin_coords: tuple, destination_coords: tuple) -> list[dict]:
     from app.corridor import build_corridor
-    all_sigmets = fetch_sigmets()
+    entries = load_sigmets()
     corridor = build_corridor(origin_coords, destination_coords)
-    return filter_sigmets_by_corridor(all_sigmets, corridor)
\ No newline at end of file
+    return filter_sigmet_entries(entries, corridor)
+
+
+def get_route_sigmets(origin_coords: tuple, destination_coords: tuple) -> list[dict]:
+    """
+    Master function: return SIGMETs and AIRMETs that intersect the route corridor.
+    """
+    return [e["sigmet"] for e in get_route_sigmet_entries(origin_coords, destination_coords)]
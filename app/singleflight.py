@@ -0,0 +1,44 @@
+import threading
+
+# In-flight computations keyed by caller-supplied key
+_calls = {}
+_lock = threading.Lock()
+
+
+class _Call:
+    """A single in-flight computation that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def do(key, fn):
+    """
+    Run fn() once for all concurrent callers sharing key.
+    The first caller computes; callers arriving while it runs wait and get
+    the same result (or the same exception). Later callers start a new run.
+    """
+    with _lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn()
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            del _calls[key]
+        call.done.set()
+    return call.result
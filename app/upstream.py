@@ -0,0 +1,196 @@
+import json
+import time
+import threading
+import requests
+from config import Config
+from app.shared_cache import cache_get, cache_set
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when an upstream endpoint failed and there is no last good data to fall back on."""
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker. Trips open after BREAKER_FAILURE_THRESHOLD consecutive
+    errors or slow responses; while open, callers are served last good data and a
+    background probe retries upstream every BREAKER_PROBE_SECONDS until it recovers.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.last_params = None
+        self.last_error = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self, elapsed: float):
+        with self.lock:
+            if elapsed > Config.BREAKER_SLOW_SECONDS:
+                self._failure_locked(f"slow response ({elapsed:.1f}s)")
+            else:
+                self.failures = 0
+                self.opened_at = None
+
+    def record_failure(self, error):
+        with self.lock:
+            self._failure_locked(str(error))
+
+    def _failure_locked(self, error: str):
+        self.failures += 1
+        self.last_error = error
+        if self.failures >= Config.BREAKER_FAILURE_THRESHOLD and self.opened_at is None:
+            self.opened_at = time.time()
+            print(f"Circuit open for {self.endpoint}: {error}")
+
+    def schedule_probe(self):
+        """Start a background probe unless one is already pending."""
+        with self.lock:
+            if self.probing or not self.is_open:
+                return
+            self.probing = True
+        timer = threading.Timer(Config.BREAKER_PROBE_SECONDS, self._probe)
+        timer.daemon = True
+        timer.start()
+
+    def _probe(self):
+        with self.lock:
+            self.probing = False
+            params = self.last_params
+        try:
+            _request(self.endpoint, params, lambda data: _store_last_good(self.endpoint, params, data))
+        except Exception:
+            pass
+        if self.is_open:
+            self.schedule_probe()
+        else:
+            print(f"Circuit closed for {self.endpoint}")
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(endpoint)
+        return _breakers[endpoint]
+
+
+STATUS_RANK = {"ok": 0, "stale": 1, "partial": 2}
+
+
+def fresh_source(endpoint: str, status: str, data_at: float | None, error=None) -> dict:
+    """
+    Freshness of one piece of upstream data: ok (just fetched), stale (last good
+    data served in place of a failed call) or partial (nothing could be served).
+    data_at is when the data was fetched from upstream, None if there is no data.
+    """
+    return {"source": endpoint, "status": status, "data_at": data_at, "error": str(error) if error else None}
+
+
+def unavailable_source(endpoint: str, error) -> dict:
+    return fresh_source(endpoint, "partial", None, error)
+
+
+def combine_sources(sources: list[dict]) -> list[dict]:
+    """
+    Merge the freshness of several calls into one entry per source, keeping the
+    worst status and the oldest data, e.g. for a route fetched in segments.
+    """
+    merged = {}
+    for source in sources:
+        if not source:
+            continue
+        current = merged.get(source["source"])
+        if current is None:
+            merged[source["source"]] = dict(source)
+            continue
+        if STATUS_RANK[source["status"]] > STATUS_RANK[current["status"]]:
+            current["status"] = source["status"]
+        if source["data_at"] is not None:
+            current["data_at"] = min(current["data_at"] or source["data_at"], source["data_at"])
+        current["error"] = current["error"] or source["error"]
+    return list(merged.values())
+
+
+def describe_sources(sources: list[dict]) -> list[dict]:
+    """Render freshness for API responses, with the age of the data at the time of the response."""
+    now = time.time()
+    return [
+        {
+            "source": source["source"],
+            "status": source["status"],
+            "age_seconds": round(now - source["data_at"]) if source["data_at"] is not None else None,
+            "error": source["error"],
+            "breaker": "open" if get_breaker(source["source"]).is_open else "closed",
+        }
+        for source in combine_sources(sources)
+    ]
+
+
+def _last_good_key(endpoint: str, params: dict) -> str:
+    return f"last_good:{endpoint}:{json.dumps(params, sort_keys=True)}"
+
+
+def _store_last_good(endpoint: str, params: dict, data):
+    cache_set(
+        _last_good_key(endpoint, params),
+        {"data": data, "stored_at": time.time()},
+        Config.UPSTREAM_LAST_GOOD_SECONDS
+    )
+
+
+def _request(endpoint: str, params: dict, on_success=None):
+    """Perform the real HTTP request, feeding the outcome to the endpoint's breaker."""
+    breaker = get_breaker(endpoint)
+    url = f"{Config.AVIATIONWEATHER_BASE_URL}/{endpoint}"
+    started = time.monotonic()
+    try:
+        response = requests.get(url, params=params, timeout=Config.UPSTREAM_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        data = response.json() if response.text.strip() else []
+    except (requests.RequestException, ValueError) as e:
+        breaker.record_failure(e)
+        raise
+    breaker.record_success(time.monotonic() - started)
+    if on_success:
+        on_success(data)
+    return data
+
+
+def upstream_get(endpoint: str, params: dict) -> tuple:
+    """
+    GET an AviationWeather.gov endpoint through its circuit breaker.
+    Returns (parsed JSON, freshness). On failure, or immediately while the breaker
+    is open, the last good response for the same params is returned instead,
+    marked stale with the time it was originally fetched.
+    Raises UpstreamUnavailable if there is nothing to fall back on.
+    """
+    breaker = get_breaker(endpoint)
+    breaker.last_params = params
+
+    if breaker.is_open:
+        breaker.schedule_probe()
+        return _serve_last_good(endpoint, params, breaker.last_error)
+
+    try:
+        data = _request(endpoint, params, lambda data: _store_last_good(endpoint, params, data))
+    except (requests.RequestException, ValueError) as e:
+        if breaker.is_open:
+            breaker.schedule_probe()
+        return _serve_last_good(endpoint, params, e)
+    return data, fresh_source(endpoint, "ok", time.time())
+
+
+def _serve_last_good(endpoint: str, params: dict, error) -> tuple:
+    last_good = cache_get(_last_good_key(endpoint, params))
+    if last_good is None:
+        raise UpstreamUnavailable(f"{endpoint} unavailable: {error}")
+    return last_good["data"], fresh_source(endpoint, "stale", last_good["stored_at"], error)
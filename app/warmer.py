@@ -0,0 +1,124 @@
+import time
+from config import Config
+from app.shared_cache import cache_get, cache_update, try_claim
+
+# Route popularity lives in the shared cache so every worker ranks the same host-wide top-N
+HISTORY_KEY = "route_history"
+
+_scheduler = None
+
+
+def _decayed_score(entry: dict, now: float) -> float:
+    """Apply exponential recency decay to a route's popularity score."""
+    elapsed = max(0.0, now - entry["last_seen"])
+    return entry["score"] * 0.5 ** (elapsed / Config.ROUTE_HISTORY_HALF_LIFE_SECONDS)
+
+
+def _prune(history: dict, now: float) -> dict:
+    """Drop routes whose decayed score has faded out, then keep only the ROUTE_HISTORY_MAX_ROUTES best."""
+    scored = [(_decayed_score(entry, now), key) for key, entry in history.items()]
+    kept = sorted((s, key) for s, key in scored if s >= Config.ROUTE_HISTORY_MIN_SCORE)
+    return {key: history[key] for _, key in kept[-Config.ROUTE_HISTORY_MAX_ROUTES:]}
+
+
+def record_route_request(origin_icao: str, destination_icao: str):
+    """Log a route request, bumping its frequency and recency."""
+    now = time.time()
+    key = (origin_icao, destination_icao)
+
+    def bump(history):
+        history = history or {}
+        entry = history.get(key)
+        if entry is None:
+            history[key] = {"score": 1.0, "count": 1, "last_seen": now}
+            # Only a new route can grow the history, so only then is pruning needed
+            return _prune(history, now)
+        entry["score"] = _decayed_score(entry, now) + 1.0
+        entry["count"] += 1
+        entry["last_seen"] = now
+        return history
+
+    cache_update(HISTORY_KEY, Config.ROUTE_HISTORY_CACHE_SECONDS, bump)
+
+
+def top_routes(n: int = None) -> list[tuple]:
+    """Return the n most popular (origin, destination) pairs across the host, most popular first."""
+    n = n or Config.ROUTE_WARMER_TOP_N
+    now = time.time()
+    history = cache_get(HISTORY_KEY) or {}
+    scored = [(_decayed_score(entry, now), key) for key, entry in history.items()]
+    scored.sort(reverse=True)
+    return [key for _, key in scored[:n]]
+
+
+def warm_popular_routes(n: int = None, time_budget: float = None) -> list[tuple]:
+    """
+    Pre-build corridors and pre-compute briefings for the top-n routes.
+    Stops once time_budget seconds have elapsed. Returns the routes warmed.
+    """
+    from app.airports import get_coords
+    from app.corridor import build_corridor
+    from app.pireps import get_route_pireps
+    from app.sigmets import load_sigmets
+
+    time_budget = time_budget or Config.ROUTE_WARMER_TIME_BUDGET_SECONDS
+    started = time.monotonic()
+    warmed = []
+
+    # One SIGMET refetch per cycle covers every route
+    try:
+        load_sigmets(refresh=True)
+    except Exception:
+        pass
+
+    for origin, destination in top_routes(n):
+        if time.monotonic() - started >= time_budget:
+            break
+        origin_coords = get_coords(origin)
+        destination_coords = get_coords(destination)
+        if not origin_coords or not destination_coords:
+            continue
+        try:
+            build_corridor(origin_coords, destination_coords)
+            airport_coords = {origin: origin_coords, destination: destination_coords}
+            get_route_pireps(origin, destination, airport_coords, refresh=True)
+            warmed.append((origin, destination))
+        except Exception:
+            continue  # Leave the previous cached briefing in place
+    return warmed
+
+
+def _once_per_host(job, interval: float):
+    """Wrap a scheduled job so that, with several workers, only the claim holder runs it."""
+    def run():
+        if try_claim(f"job:{job.__name__}", interval):
+            job()
+    run.__name__ = job.__name__
+    return run
+
+
+def start_route_warmer():
+    """
+    Start the background warmer. Runs just ahead of route cache expiry so
+    popular routes and the national overlay tiles are refreshed before anyone
+    has to wait on them. Every worker schedules the jobs, but only one per host runs them.
+    """
+    global _scheduler
+    if _scheduler is not None:
+        return _scheduler
+
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from app.overlay import refresh_overlay
+
+    interval = max(1, Config.ROUTE_CACHE_SECONDS - Config.ROUTE_WARMER_TIME_BUDGET_SECONDS)
+    _scheduler = BackgroundScheduler(daemon=True)
+    for job in (warm_popular_routes, refresh_overlay):
+        _scheduler.add_job(
+            _once_per_host(job, interval),
+            "interval",
+            seconds=interval,
+            max_instances=1,
+            coalesce=True,
+        )
+    _scheduler.start()
+    return _scheduler
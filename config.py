@@ -22,3 +22,64 @@ class Config:
     PIREP_LOOKBACK_HOURS_SHORT = 2  # How far back to fetch PIREPs in hours (routes < 500nm / SH_DISTANCE)
     PIREP_LOOKBACK_HOURS_MED = 4    # How far back to fetch PIREPs in hours (routes < 1500nm / MD_DISTANCE)
     PIREP_LOOKBACK_HOURS_LONG = 6   # How far back to fetch PIREPs in hours (routes > 1500nm / MD_DISTANCE)
+
+    # SIGMET Geometry
+    SIGMET_REFRESH_SECONDS = POLL_INTERVAL_SECONDS          # How long a parsed SIGMET set is reused before refetching
+    SIGMET_SIMPLIFY_TOLERANCES = (0.01, 0.05, 0.1)          # Display simplification tolerances in degrees
+    SIGMET_DISPLAY_TOLERANCE = 0.01                         # Tolerance used when drawing SIGMETs on the route map
+
+    # Route Caching / Warming
+    CORRIDOR_CACHE_SIZE = 256                               # Max memoized route corridors
+    ROUTE_CACHE_SECONDS = POLL_INTERVAL_SECONDS             # How long a computed route briefing is served from cache
+    ROUTE_DEGRADED_CACHE_SECONDS = 30                       # Same, for a stale/partial briefing, so upstream recovery shows up quickly
+    ROUTE_WARMER_ENABLED = True                             # Pre-compute briefings for popular routes in the background
+    ROUTE_WARMER_TOP_N = 20                                 # Number of most popular routes to keep warm
+    ROUTE_WARMER_TIME_BUDGET_SECONDS = 60                   # Max time a single warm cycle may spend
+    ROUTE_HISTORY_HALF_LIFE_SECONDS = 24 * 3600             # Recency decay for route popularity scores
+    ROUTE_HISTORY_MIN_SCORE = 0.05                          # Routes whose decayed score falls below this are forgotten
+    ROUTE_HISTORY_MAX_ROUTES = 1000                         # Max routes tracked; the lowest scores are dropped first
+    ROUTE_HISTORY_CACHE_SECONDS = 7 * 24 * 3600             # Popularity is forgotten after this long without requests
+
+    # Shared Cache (one copy per host across all worker processes)
+    SHARED_CACHE_PATH = os.path.join(BASE_DIR, "data", "cache.sqlite3")
+    SHARED_CACHE_MAX_BYTES = 128 * 1024 * 1024              # Oldest entries are evicted past this size
+    SHARED_CACHE_LEASE_SECONDS = 30                         # How long one worker may hold a key while computing it
+    SHARED_CACHE_POLL_SECONDS = 0.05                        # How often waiting workers re-check for a result
+    CORRIDOR_CACHE_SECONDS = 24 * 3600                      # Corridors never change, so keep them for a day
+    AIRPORTS_CACHE_SECONDS = 24 * 3600                      # How long the parsed airport set is shared
+
+    # Startup
+    AIRPORTS_PRELOAD = True                                 # Load the airport database in the background at startup
+
+    # National Overlay Tiles
+    OVERLAY_BBOX = (15.0, -170.0, 72.0, -50.0)              # (min_lat, min_lon, max_lat, max_lon) covered by the overlay
+    OVERLAY_FETCH_GRID = (3, 4)                             # (rows, cols) the bbox is split into per fetch
+    OVERLAY_LOOKBACK_HOURS = PIREP_LOOKBACK_HOURS_SHORT     # PIREP age shown on the overlay
+    OVERLAY_REFRESH_SECONDS = POLL_INTERVAL_SECONDS         # One overlay build per ingest cycle
+    OVERLAY_INDEX_ZOOM = 6                                  # Zoom level PIREPs are bucketed at
+    OVERLAY_PRECOMPUTE_ZOOM = 5                             # Tiles up to this zoom are built ahead of requests
+    OVERLAY_MAX_ZOOM = 12                                   # Deepest zoom served
+    OVERLAY_TILE_MAX_AGE_SECONDS = 60                       # Browser cache lifetime for served tiles
+
+    # ATIS Persistence
+    ATIS_FLUSH_SECONDS = 5                                  # Max delay before changed observations are written to SQLite
+    ATIS_FLUSH_BATCH_SIZE = 50                              # Flush early once this many writes are pending
+    ATIS_SHARED_SECONDS = 24 * 3600                         # How long the host-wide last observation per airport is cached
+    ATIS_FETCH_CACHE_SECONDS = 60                           # How long one worker's METAR fetch is reused by the others
+
+    # ATIS History
+    ATIS_HISTORY_MAX_PAGE = 500                             # Max rows per /api/atis/history page
+    ATIS_EXPORT_BATCH_SIZE = 1000                           # Rows fetched per round trip while streaming an export
+
+    # Airport Search
+    AIRPORT_NEARBY_RADIUS_NM = 50                           # Default search radius for nearby airports
+    AIRPORT_NEARBY_MAX_RADIUS_NM = 500                      # Upper bound on ?radius_nm= for nearby airports
+    AIRPORT_SEARCH_MAX_RESULTS = 50                         # Upper bound on results per search/nearby query
+    AIRPORT_CORRIDOR_MAX_PAGE = 500                         # Max airports per page when listing a route corridor
+
+    # Upstream Resilience
+    UPSTREAM_TIMEOUT_SECONDS = 10                           # Per-request timeout for AviationWeather.gov
+    UPSTREAM_LAST_GOOD_SECONDS = 6 * 3600                   # How long the last good response is kept as a fallback
+    BREAKER_FAILURE_THRESHOLD = 3                           # Consecutive errors/slow responses before the circuit opens
+    BREAKER_SLOW_SECONDS = 5                                # Responses slower than this count as failures
+    BREAKER_PROBE_SECONDS = 30                              # How often an open circuit probes upstream in the background
@@ -36,6 +36,15 @@
         document.getElementById("refresh-status").textContent = `Last updated: ${now} — refreshes every 5 min`;
     }
 
+    function sourceNotice(sources) {
+        // Warn when data is served from the last good copy or is missing pieces
+        return (sources || []).filter(s => s.status !== "ok").map(s => {
+            const age = s.age_seconds != null ? ` (last updated ${Math.round(s.age_seconds / 60)} min ago)` : "";
+            const what = s.status === "stale" ? "is stale" : "may be incomplete";
+            return `<div class="source-notice">${s.source.toUpperCase()} data ${what}${age}</div>`;
+        }).join("");
+    }
+
     async function loadPireps() {
         const panel = document.getElementById("tab-pireps");
         panel.innerHTML = `<div class="loading">Fetching PIREPs...</div>`;
@@ -43,10 +52,10 @@
             const res = await fetch(`/api/pireps?origin=${currentOrigin}&destination=${currentDestination}`);
             const data = await res.json();
             if (!data.pireps || data.pireps.length === 0) {
-                panel.innerHTML = `<div class="empty-state">No PIREPs found along this route.</div>`;
+                panel.innerHTML = sourceNotice(data.sources) + `<div class="empty-state">No PIREPs found along this route.</div>`;
                 return;
             }
-             panel.innerHTML = data.pireps.map(p => {
+             panel.innerHTML = sourceNotice(data.sources) + data.pireps.map(p => {
                 const turb = p.tbInt1 || null;
                 const ice = p.icgInt1 || null;
                 const alt = p.fltLvl ? `FL${String(p.fltLvl).padStart(3, '0')}` : "Unknown";
@@ -74,7 +83,7 @@
         try {
             const res = await fetch(`/api/atis?airports=${currentOrigin},${currentDestination}`);
             const data = await res.json();
-            panel.innerHTML = data.airports.map(a => {
+            panel.innerHTML = sourceNotice(data.sources) + data.airports.map(a => {
             const changed = a.changed;
             return `
                 <div class="data-card">
@@ -85,6 +94,7 @@
                         </span>
                     </div>
                     ${changed ? `<div>Previous: <span class="raw">${a.previous}</span></div>` : ""}
+                    ${changed && a.diff && Object.keys(a.diff).length ? `<div>Changed: ${Object.keys(a.diff).join(", ")}</div>` : ""}
                     <div class="raw">${a.current || a.reason || "No data available"}</div>
                 </div>`;
         }).join("");
@@ -111,10 +121,10 @@
         const res = await fetch(`/api/sigmets?origin=${currentOrigin}&destination=${currentDestination}`);
         const data = await res.json();
         if (!data.sigmets || data.sigmets.length === 0) {
-            panel.innerHTML = `<div class="empty-state">No SIGMETs or AIRMETs along this route.</div>`;
+            panel.innerHTML = sourceNotice(data.sources) + `<div class="empty-state">No SIGMETs or AIRMETs along this route.</div>`;
             return;
         }
-        panel.innerHTML = data.sigmets.map(s => {
+        panel.innerHTML = sourceNotice(data.sources) + data.sigmets.map(s => {
             const type = s.airSigmetType || "SIGMET";
             const hazard = s.hazard || "UNKNOWN";
             const altLow = s.altitudeLow1 ? `${s.altitudeLow1.toLocaleString()}ft` : "SFC";
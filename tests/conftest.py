@@ -1,4 +1,13 @@
 import sys
 import os
+import pytest
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
\ No newline at end of file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(tmp_path, monkeypatch):
+    """Give every test its own empty host-wide cache database."""
+    db_path = str(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr("config.Config.SHARED_CACHE_PATH", db_path)
+    return db_path
@@ -0,0 +1,156 @@
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch
+from app import airports as airports_module
+from app.airports import (
+    preload_airports,
+    airports_status,
+    get_coords,
+    build_index,
+    search_airports,
+    nearby_airports,
+    airports_in_corridor,
+    airports_along_route,
+)
+from app.corridor import build_corridor, build_great_circle_line
+
+FAKE_AIRPORTS = {
+    "KORD": {"icao": "KORD", "name": "Chicago O'Hare International Airport", "latitude": 41.97, "longitude": -87.90},
+}
+
+SEARCH_AIRPORTS = {
+    "KORD": {"icao": "KORD", "name": "Chicago O'Hare International Airport", "latitude": 41.9786, "longitude": -87.9048},
+    "KMDW": {"icao": "KMDW", "name": "Chicago Midway International Airport", "latitude": 41.7868, "longitude": -87.7522},
+    "KORB": {"icao": "KORB", "name": "Bob Sikes Airport", "latitude": 30.7836, "longitude": -86.5219},
+    "KOMA": {"icao": "KOMA", "name": "Eppley Airfield", "latitude": 41.3032, "longitude": -95.8941},
+    "KDEN": {"icao": "KDEN", "name": "Denver International Airport", "latitude": 39.8617, "longitude": -104.6731},
+    "KSFO": {"icao": "KSFO", "name": "San Francisco International Airport", "latitude": 37.6190, "longitude": -122.3750},
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_airports():
+    airports_module._cache.clear()
+    airports_along_route.cache_clear()
+    airports_module._load_state.update({"error": None, "load_seconds": None})
+    yield
+    airports_module._cache.clear()
+    airports_module._index.update({"idents": [], "names": [], "trigrams": {}, "grid": {}})
+
+
+@pytest.fixture
+def indexed_airports():
+    airports_module._index.update(build_index(SEARCH_AIRPORTS))
+    airports_module._cache.update(SEARCH_AIRPORTS)
+
+
+def test_not_ready_before_load():
+    assert airports_status()["ready"] is False
+
+
+def test_preload_marks_ready():
+    with patch("app.airports.parse_airports_csv", return_value=FAKE_AIRPORTS):
+        preload_airports().join()
+    status = airports_status()
+    assert status["ready"] is True
+    assert status["count"] == 1
+    assert get_coords("kord") == (41.97, -87.90)
+
+
+def test_preload_failure_is_reported():
+    with patch("app.airports.parse_airports_csv", side_effect=OSError("no network")):
+        preload_airports().join()
+    status = airports_status()
+    assert status["ready"] is False
+    assert status["error"] == "no network"
+
+
+def test_heavy_libraries_not_imported_at_startup():
+    code = (
+        "import sys; import app.routes; "
+        "print(','.join(m for m in ('folium', 'shapely', 'pyproj') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_search_ranks_exact_ident_then_prefix(indexed_airports):
+    results = [a["icao"] for a in search_airports("kor")]
+    assert results == ["KORB", "KORD"]
+    assert [a["icao"] for a in search_airports("KORD")][0] == "KORD"
+
+
+def test_search_by_name_prefix_and_substring(indexed_airports):
+    assert [a["icao"] for a in search_airports("chicago")] == ["KMDW", "KORD"]
+    assert [a["icao"] for a in search_airports("o'hare")] == ["KORD"]
+    assert search_airports("nowhere") == []
+
+
+def test_nearby_sorted_by_distance(indexed_airports):
+    results = nearby_airports(41.9786, -87.9048, radius_nm=50)
+    assert [a["icao"] for a in results] == ["KORD", "KMDW"]
+    assert results[0]["distance_nm"] == 0
+    assert 10 < results[1]["distance_nm"] < 15
+
+
+def test_airports_in_route_corridor_ordered_along_route(indexed_airports):
+    route = ((41.9786, -87.9048), (39.8617, -104.6731))
+    results = airports_in_corridor(build_corridor(*route), build_great_circle_line(*route))
+    icaos = [a["icao"] for a in results]
+    assert icaos[0] == "KORD" and icaos[-1] == "KDEN"
+    assert set(icaos) == {"KORD", "KMDW", "KOMA", "KDEN"}
+    assert [a["along_route_nm"] for a in results] == sorted(a["along_route_nm"] for a in results)
+    assert results[0]["off_route_nm"] < 1
+
+
+def test_airports_along_route_built_once_per_route(indexed_airports):
+    route = ((41.9786, -87.9048), (39.8617, -104.6731))
+    with patch("app.airports.airports_in_corridor", wraps=airports_in_corridor) as query:
+        first = airports_along_route(*route)
+        # Paging through the list again must not rebuild it
+        assert airports_along_route(*route) is first
+    assert query.call_count == 1
+    assert [a["icao"] for a in first][0] == "KORD"
+
+
+def test_nearby_endpoint_clamps_radius(indexed_airports):
+    from flask import Flask
+    from app.routes import main
+
+    app = Flask(__name__)
+    app.register_blueprint(main)
+    with patch("app.routes.nearby_airports", return_value=[]) as nearby:
+        response = app.test_client().get("/api/airports/nearby?lat=41.97&lon=-87.90&radius_nm=200000")
+    assert response.status_code == 200
+    assert response.get_json()["radius_nm"] == 500
+    assert nearby.call_args.kwargs["radius_nm"] == 500
+
+
+def test_nearby_wraps_across_antimeridian():
+    airports = {
+        "PASY": {"icao": "PASY", "name": "Eareckson Air Station", "latitude": 52.71, "longitude": 174.11},
+        "PADK": {"icao": "PADK", "name": "Adak Airport", "latitude": 51.88, "longitude": -176.65},
+    }
+    airports_module._index.update(build_index(airports))
+    airports_module._cache.update(airports)
+    results = nearby_airports(52.0, 179.9, radius_nm=400)
+    assert [a["icao"] for a in results] == ["PADK", "PASY"]
+
+
+def test_airports_in_corridor_over_antimeridian():
+    route = ((21.32, -157.92), (35.76, 140.39))
+    line = build_great_circle_line(*route)
+    # A field right under the route, just west of the dateline
+    lon, lat = next((lon, lat) for lon, lat in line.coords if 177 < lon < 179)
+    airports = {
+        "PHNL": {"icao": "PHNL", "name": "Daniel K Inouye International Airport", "latitude": 21.32, "longitude": -157.92},
+        "XDTL": {"icao": "XDTL", "name": "Dateline Test Field", "latitude": lat, "longitude": lon},
+        "RJAA": {"icao": "RJAA", "name": "Narita International Airport", "latitude": 35.76, "longitude": 140.39},
+    }
+    airports_module._index.update(build_index(airports))
+    airports_module._cache.update(airports)
+
+    results = airports_in_corridor(build_corridor(*route), line)
+    assert [a["icao"] for a in results] == ["PHNL", "XDTL", "RJAA"]
+    assert results[1]["off_route_nm"] < 1
@@ -1,7 +1,21 @@
 import sqlite3
 import pytest
 from unittest.mock import patch
-from app.atis import get_last_atis, save_atis, check_for_atis_change
+from app import atis as atis_module
+from app.atis import (
+    fetch_atis,
+    get_last_atis,
+    save_atis,
+    check_for_atis_change,
+    flush_atis_writes,
+    warm_atis_cache,
+    decode_metar,
+    save_atis_batch,
+    get_atis_history,
+    iter_atis_history,
+    decode_history_cursor,
+    normalize_timestamp,
+)
 
 # --- Fixtures ---
 
@@ -24,7 +38,10 @@ def test_db(tmp_path, monkeypatch):
     """)
     conn.commit()
     conn.close()
-    return db_path
+    atis_module._last_obs.clear()
+    yield db_path
+    flush_atis_writes()
+    atis_module._last_obs.clear()
 
 
 # --- Tests ---
@@ -102,4 +119,201 @@ def test_check_atis_unavailable(test_db):
     with patch("app.atis.fetch_atis", return_value=None):
         result = check_for_atis_change("KORD")
     assert result["changed"] == False
-    assert result["reason"] == "No ATIS available"
\ No newline at end of file
+    assert result["reason"] == "No ATIS available"
+
+
+def test_check_change_includes_field_diff(test_db):
+    """A change should report which decoded METAR fields moved."""
+    old_atis = {
+        "airport": "KORD",
+        "identifier": "BRAVO",
+        "raw_text": "KORD 191952Z 27015KT 10SM FEW045 BKN250 08/M04 A2992"
+    }
+    new_atis = {
+        "airport": "KORD",
+        "identifier": "CHARLIE",
+        "raw_text": "KORD 192052Z 28018G25KT 10SM SCT040 BKN200 07/M05 A2995"
+    }
+    save_atis(old_atis)
+    with patch("app.atis.fetch_atis", return_value=new_atis):
+        result = check_for_atis_change("KORD")
+    assert set(result["diff"]) == {"wind", "ceiling_ft", "altimeter_inhg"}
+    assert result["diff"]["altimeter_inhg"] == {"previous": 29.92, "current": 29.95}
+
+
+def test_poll_does_no_disk_io_once_warm(test_db):
+    """After warming, unchanged polls compare in memory and changes persist only on flush."""
+    atis = {
+        "airport": "KORD",
+        "identifier": "BRAVO",
+        "raw_text": "KORD 191952Z 27015KT 10SM FEW045 BKN250 08/M04 A2992"
+    }
+    save_atis(atis)
+    warm_atis_cache()
+    with patch("app.atis.fetch_atis", return_value=dict(atis)), \
+         patch("app.atis.sqlite3.connect", side_effect=AssertionError("disk I/O")):
+        assert check_for_atis_change("KORD")["changed"] == False
+
+    changed = dict(atis, raw_text="KORD 192052Z 28018KT 10SM SCT040 BKN200 07/M05 A2995")
+    with patch("app.atis.fetch_atis", return_value=changed), \
+         patch("app.atis.save_atis_batch", side_effect=AssertionError("inline write")):
+        result = check_for_atis_change("KORD")
+    assert result["changed"] == True
+
+    flush_atis_writes()
+    assert get_last_atis("KORD")["raw_text"] == changed["raw_text"]
+
+
+def test_change_is_recorded_once_across_workers(test_db):
+    """Two workers warmed with the same observation must not both save and report a change."""
+    old_atis = {
+        "airport": "KORD",
+        "identifier": "BRAVO",
+        "raw_text": "KORD 191952Z 27015KT 10SM FEW045 BKN250 08/M04 A2992"
+    }
+    new_atis = dict(old_atis, identifier="CHARLIE", raw_text="KORD 192052Z 28018KT 10SM SCT040 BKN200 07/M05 A2995")
+    save_atis(old_atis)
+    warm_atis_cache()
+    other_worker = dict(atis_module._last_obs)
+
+    with patch("app.atis.fetch_atis", side_effect=lambda icao: dict(new_atis)):
+        first = check_for_atis_change("KORD")
+        atis_module._last_obs.clear()
+        atis_module._last_obs.update(other_worker)
+        second = check_for_atis_change("KORD")
+    flush_atis_writes()
+
+    assert first["changed"] == True
+    assert second["changed"] == False
+    conn = sqlite3.connect(test_db)
+    count = conn.execute("SELECT COUNT(*) FROM atis_log WHERE raw_text = ?", (new_atis["raw_text"],)).fetchone()[0]
+    conn.close()
+    assert count == 1
+
+
+def test_decode_metar_fractional_visibility_and_vertical_visibility():
+    fields = decode_metar("KDEN 192052Z VRB03KT 1 1/2SM BR VV002 07/M05 A2995")
+    assert fields["wind"] == {"direction": None, "speed_kt": 3, "gust_kt": None}
+    assert fields["visibility_sm"] == 1.5
+    assert fields["ceiling_ft"] == 200
+
+
+@pytest.fixture
+def history_rows(test_db):
+    """Three hourly observations at each of two airports."""
+    rows = [
+        {"airport": airport, "identifier": "METAR", "raw_text": f"{airport} {hour:02d}00Z", "fetched_at": f"2026-10-18 {hour:02d}:00:00"}
+        for airport in ("KDEN", "KORD")
+        for hour in (10, 11, 12)
+    ]
+    save_atis_batch(rows)
+    return rows
+
+
+def read_all_pages(**filters):
+    seen = []
+    after = None
+    while True:
+        rows, next_cursor = get_atis_history(after=decode_history_cursor(after) if after else None, limit=2, **filters)
+        seen.extend(r["raw_text"] for r in rows)
+        if not next_cursor:
+            return seen
+        after = next_cursor
+
+
+def test_history_pages_cover_every_row_once(history_rows):
+    """Following next_cursor should walk all rows in (airport, fetched_at) order."""
+    assert read_all_pages(airports=["KDEN", "KORD"]) == [r["raw_text"] for r in history_rows]
+
+
+def test_history_without_airports_pages_in_time_order(history_rows):
+    seen = read_all_pages(start=normalize_timestamp("2026-10-18T11:00:00Z"))
+    assert seen == ["KDEN 1100Z", "KORD 1100Z", "KDEN 1200Z", "KORD 1200Z"]
+
+
+def test_time_range_history_seeks_the_time_index(tmp_path, monkeypatch):
+    from app import init_db
+    from app.atis import _history_query
+    db_path = str(tmp_path / "indexed.sqlite3")
+    monkeypatch.setattr("config.Config.DB_PATH", db_path)
+    init_db()
+    sql, params = _history_query(start="2026-10-18 00:00:00", after=("2026-10-18 01:00:00", 5))
+    conn = sqlite3.connect(db_path)
+    plan = " ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params + [100]))
+    conn.close()
+    assert "idx_atis_log_time" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_airport_history_seeks_the_airport_index(tmp_path, monkeypatch):
+    from app import init_db
+    from app.atis import _history_query
+    db_path = str(tmp_path / "indexed.sqlite3")
+    monkeypatch.setattr("config.Config.DB_PATH", db_path)
+    init_db()
+    sql, params = _history_query("KDEN", start="2026-10-18 00:00:00", after=("2026-10-18 01:00:00", 5))
+    conn = sqlite3.connect(db_path)
+    plan = " ".join(r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params + [100]))
+    conn.close()
+    assert "idx_atis_log_airport_time (airport=? AND fetched_at>?)" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_export_does_not_block_writes(history_rows, monkeypatch):
+    """A slow export must not hold a read lock that stalls the write-behind flush."""
+    monkeypatch.setattr("app.atis.Config.ATIS_EXPORT_BATCH_SIZE", 2)
+    rows = iter_atis_history()
+    first = next(rows)
+    conn = sqlite3.connect(atis_module.Config.DB_PATH, timeout=0)
+    conn.execute("INSERT INTO atis_log (airport, identifier, raw_text) VALUES ('KSFO', 'METAR', 'KSFO')")
+    conn.commit()
+    conn.close()
+    assert [first["raw_text"]] + [r["raw_text"] for r in rows][:5] == [
+        "KDEN 1000Z", "KORD 1000Z", "KDEN 1100Z", "KORD 1100Z", "KDEN 1200Z", "KORD 1200Z"
+    ]
+
+
+def test_history_filters_by_airport_and_time(history_rows):
+    rows, next_cursor = get_atis_history(
+        airports=["KORD"],
+        start=normalize_timestamp("2026-10-18T11:00:00Z"),
+        end=normalize_timestamp("2026-10-18T12:00:00+00:00"),
+    )
+    assert [r["raw_text"] for r in rows] == ["KORD 1100Z"]
+    assert next_cursor is None
+
+
+def test_history_rejects_bad_cursor():
+    with pytest.raises(ValueError):
+        decode_history_cursor("not-a-cursor")
+
+
+def test_history_export_streams_ndjson_and_csv(history_rows):
+    import json
+    from flask import Flask
+    from app.routes import main
+
+    app = Flask(__name__)
+    app.register_blueprint(main)
+    client = app.test_client()
+
+    response = client.get("/api/atis/history/export?airports=KDEN&format=ndjson")
+    assert response.is_streamed
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["raw_text"] for line in lines] == ["KDEN 1000Z", "KDEN 1100Z", "KDEN 1200Z"]
+
+    response = client.get("/api/atis/history/export?airports=KDEN&format=csv")
+    csv_lines = response.get_data(as_text=True).splitlines()
+    assert csv_lines[0] == "id,airport,identifier,raw_text,fetched_at"
+    assert len(csv_lines) == 4
+
+
+def test_metar_fetch_is_shared_across_polls():
+    metar = [{"metarType": "METAR", "rawOb": "KORD 191952Z 27015KT"}]
+    source = {"source": "metar", "status": "ok", "data_at": 1.0, "error": None}
+    with patch("app.atis.upstream_get", return_value=(metar, source)) as mock_get:
+        first = fetch_atis("KORD")
+        second = fetch_atis("KORD")
+    assert first == second
+    assert first["raw_text"] == "KORD 191952Z 27015KT"
+    assert mock_get.call_count == 1
@@ -0,0 +1,96 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch
+from app import overlay as overlay_module
+from app.overlay import tile_bounds, lat_lon_to_tile, index_pireps, build_tile, get_tile, load_overlay
+from app.sigmets import prepare_sigmets
+
+PIREPS = [
+    {"lat": 40.9, "lon": -96.0, "tbInt1": "MOD", "rawOb": "UA /OV OBH"},
+    {"lat": 25.0, "lon": -80.0, "rawOb": "UA /OV MIA"},
+    {"lat": 25.0, "lon": -80.0, "pirepType": "ARP"},
+]
+SIGMET = {
+    "hazard": "ICING",
+    "coords": [
+        {"lat": 40.0, "lon": -98.0},
+        {"lat": 42.0, "lon": -98.0},
+        {"lat": 42.0, "lon": -94.0},
+        {"lat": 40.0, "lon": -94.0},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_overlay():
+    overlay_module._overlay_cache.update({"built_at": 0.0, "pirep_index": {}, "sigmets": []})
+    yield
+    overlay_module._overlay_cache.update({"built_at": 0.0, "pirep_index": {}, "sigmets": []})
+
+
+def make_overlay():
+    return {"built_at": 1.0, "pirep_index": index_pireps(PIREPS), "sigmets": prepare_sigmets([SIGMET])}
+
+
+def test_point_falls_inside_its_tile():
+    x, y = lat_lon_to_tile(40.9, -96.0, 8)
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(8, x, y)
+    assert min_lat <= 40.9 < max_lat
+    assert min_lon <= -96.0 < max_lon
+
+
+def test_world_tile_has_everything_but_acars():
+    tile = build_tile(make_overlay(), 0, 0, 0)
+    kinds = [f["properties"]["kind"] for f in tile["features"]]
+    assert kinds.count("pirep") == 2
+    assert kinds.count("sigmet") == 1
+
+
+def test_deep_tile_only_has_nearby_reports():
+    x, y = lat_lon_to_tile(40.9, -96.0, 10)
+    tile = build_tile(make_overlay(), 10, x, y)
+    pireps = [f for f in tile["features"] if f["properties"]["kind"] == "pirep"]
+    assert [f["properties"]["rawOb"] for f in pireps] == ["UA /OV OBH"]
+    assert pireps[0]["properties"]["color"] == "#ff6b00"
+
+
+def test_sigmet_is_clipped_to_tile():
+    x, y = lat_lon_to_tile(41.0, -96.0, 10)
+    min_lat, min_lon, max_lat, max_lon = tile_bounds(10, x, y)
+    tile = build_tile(make_overlay(), 10, x, y)
+    sigmet = next(f for f in tile["features"] if f["properties"]["kind"] == "sigmet")
+    for lon, lat in sigmet["geometry"]["coordinates"][0]:
+        assert min_lon - 1e-9 <= lon <= max_lon + 1e-9
+        assert min_lat - 1e-9 <= lat <= max_lat + 1e-9
+
+
+def test_tiles_are_served_from_cache():
+    with patch("app.overlay._build_overlay", return_value=make_overlay()), \
+         patch("app.overlay.build_tile", wraps=build_tile) as mock_build:
+        first = get_tile(3, 1, 2)
+        second = get_tile(3, 1, 2)
+    assert first == second
+    assert mock_build.call_count == 1
+
+
+def test_rebuild_does_not_block_cached_tiles():
+    with patch("app.overlay._build_overlay", return_value=make_overlay()):
+        cached = get_tile(3, 1, 2)
+
+    release = threading.Event()
+
+    def slow_build():
+        release.wait(2)
+        return dict(make_overlay(), built_at=2.0)
+
+    with patch("app.overlay._build_overlay", side_effect=slow_build):
+        rebuild = threading.Thread(target=load_overlay, kwargs={"refresh": True})
+        rebuild.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        assert get_tile(3, 1, 2) == cached
+        assert time.monotonic() - started < 0.5
+        release.set()
+        rebuild.join()
+    assert load_overlay()["built_at"] == 2.0
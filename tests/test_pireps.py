@@ -1,10 +1,19 @@
+import time
 import pytest
+import requests
+from unittest.mock import patch
+from app import upstream
 from app.corridor import compute_bbox, build_corridor
-from app.pireps import filter_pireps_by_corridor
+from app.pireps import filter_pireps_by_corridor, fetch_pireps_for_route, get_route_pireps
+from app.upstream import UpstreamUnavailable, fresh_source, unavailable_source
+from config import Config
 
 # Sample airports
 KORD = (41.97, -87.90)
 KDEN = (39.85, -104.67)
+KSFO = (37.62, -122.38)
+PHNL = (21.32, -157.92)
+RJAA = (35.76, 140.39)
 
 def test_compute_bbox_ordering():
     bbox = compute_bbox(KORD, KDEN)
@@ -23,6 +32,15 @@ def test_corridor_contains_midpoint():
     from shapely.geometry import Point
     assert corridor.contains(Point(mid_lon, mid_lat))
 
+def test_corridor_over_antimeridian_covers_the_route():
+    import shapely
+    from app.corridor import build_great_circle_line
+    corridor = build_corridor(PHNL, RJAA)
+    assert corridor.is_valid
+    lons, lats = zip(*build_great_circle_line(PHNL, RJAA).coords)
+    assert shapely.contains_xy(corridor, lons, lats).all()
+    assert corridor.bounds[0] >= -180 and corridor.bounds[2] <= 180
+
 def test_filter_removes_out_of_corridor_pireps():
     from shapely.geometry import Point
     corridor = build_corridor(KORD, KDEN)
@@ -33,4 +51,64 @@ def test_filter_removes_out_of_corridor_pireps():
     ]
     results = filter_pireps_by_corridor(fake_pireps, corridor)
     assert len(results) == 1
-    assert results[0]["lon"] == -96.0
\ No newline at end of file
+    assert results[0]["lon"] == -96.0
+
+
+@pytest.fixture
+def upstream_down(monkeypatch):
+    upstream._breakers.clear()
+    monkeypatch.setattr("app.upstream.CircuitBreaker.schedule_probe", lambda self: None)
+    with patch("app.upstream.requests.get", side_effect=requests.ConnectionError("down")):
+        yield
+    upstream._breakers.clear()
+
+
+def test_single_segment_route_without_fallback_is_partial(upstream_down):
+    pireps, source = fetch_pireps_for_route(KORD, KDEN, lookback_hours=2)
+    assert pireps == []
+    assert source["status"] == "partial"
+
+
+def test_failed_segment_keeps_route_partial():
+    segments = [([{"receiptTime": "1", "icaoId": "A"}], fresh_source("pirep", "ok", 1.0)), UpstreamUnavailable("down")]
+    with patch("app.pireps.fetch_pireps", side_effect=segments + [([], fresh_source("pirep", "ok", 2.0))]):
+        pireps, source = fetch_pireps_for_route(KORD, KSFO, lookback_hours=2)
+    assert len(pireps) == 1
+    assert source["status"] == "partial"
+
+
+def test_cached_briefing_keeps_its_freshness():
+    stale = fresh_source("pirep", "stale", 1.0, "timed out")
+    coords = {"KORD": KORD, "KDEN": KDEN}
+    with patch("app.pireps.build_route_pireps", return_value=([], stale)):
+        get_route_pireps("KORD", "KDEN", coords)
+    # Served from the shared cache, as another worker would see it
+    assert get_route_pireps("KORD", "KDEN", coords)[1] == stale
+
+
+def test_partial_briefing_picks_up_upstream_recovery():
+    coords = {"KORD": KORD, "KDEN": KDEN}
+    healthy = ([{"receiptTime": "1", "icaoId": "A"}], fresh_source("pirep", "ok", 2.0))
+    with patch("app.pireps.build_route_pireps", side_effect=[([], unavailable_source("pirep", "down")), healthy]):
+        assert get_route_pireps("KORD", "KDEN", coords)[1]["status"] == "partial"
+        # Well within ROUTE_CACHE_SECONDS, but past the short TTL for degraded briefings
+        later = time.time() + Config.ROUTE_DEGRADED_CACHE_SECONDS + 1
+        assert later < time.time() + Config.ROUTE_CACHE_SECONDS
+        with patch("app.shared_cache.time.time", return_value=later):
+            assert get_route_pireps("KORD", "KDEN", coords) == healthy
+            # The healthy briefing is cached normally
+            assert get_route_pireps("KORD", "KDEN", coords) == healthy
+
+
+def test_pireps_endpoint_reports_partial_instead_of_failing(upstream_down):
+    from flask import Flask
+    from app.routes import main
+
+    app = Flask(__name__)
+    app.register_blueprint(main)
+    with patch("app.routes.get_coords", side_effect={"KORD": KORD, "KDEN": KDEN}.get):
+        response = app.test_client().get("/api/pireps?origin=KORD&destination=KDEN")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["pireps"] == []
+    assert body["sources"][0]["status"] == "partial"
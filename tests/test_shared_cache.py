@@ -0,0 +1,116 @@
+import time
+import threading
+import multiprocessing
+from unittest.mock import patch
+from app.shared_cache import (
+    cache_get,
+    cache_set,
+    cache_update,
+    get_or_compute,
+    try_claim,
+    _acquire_lease,
+    _release_lease,
+)
+
+
+def test_set_and_get_roundtrip():
+    cache_set("k", {"a": [1, 2, 3]}, ttl=60)
+    assert cache_get("k") == {"a": [1, 2, 3]}
+
+
+def test_expired_entry_is_a_miss():
+    cache_set("k", "v", ttl=60)
+    with patch("app.shared_cache.time.time", return_value=time.time() + 120):
+        assert cache_get("k", "missing") == "missing"
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr("app.shared_cache.Config.SHARED_CACHE_MAX_BYTES", 3000)
+    for i in range(5):
+        cache_set(f"k{i}", "x" * 1000, ttl=60)
+    # Oldest entries are evicted first
+    assert cache_get("k0") is None
+    assert cache_get("k4") == "x" * 1000
+
+
+def test_get_or_compute_only_computes_once():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 42
+
+    assert get_or_compute("k", 60, compute) == 42
+    assert get_or_compute("k", 60, compute) == 42
+    assert len(calls) == 1
+
+
+def test_waiters_share_the_lease_holders_result(monkeypatch):
+    monkeypatch.setattr("app.shared_cache.Config.SHARED_CACHE_POLL_SECONDS", 0.01)
+    holder_ready = threading.Event()
+
+    def hold_lease_then_write():
+        assert _acquire_lease("k", 30)
+        holder_ready.set()
+        time.sleep(0.1)
+        cache_set("k", "from holder", ttl=60)
+        _release_lease("k")
+
+    holder = threading.Thread(target=hold_lease_then_write)
+    holder.start()
+    holder_ready.wait()
+    result = get_or_compute("k", 60, lambda: "from waiter")
+    holder.join()
+    assert result == "from holder"
+
+
+def test_concurrent_updates_are_not_lost():
+    def increment():
+        for _ in range(20):
+            cache_update("counter", 60, lambda n: (n or 0) + 1)
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache_get("counter") == 80
+
+
+def test_forced_refresh_recomputes_once(monkeypatch):
+    monkeypatch.setattr("app.shared_cache.Config.SHARED_CACHE_POLL_SECONDS", 0.01)
+    cache_set("k", "old", ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "new"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(get_or_compute("k", 60, compute, force=True)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["new"] * 3
+    assert len(calls) == 1
+
+
+def _claim_in_other_worker(key, queue):
+    queue.put(try_claim(key, 60))
+
+
+def test_claim_is_held_by_one_worker():
+    assert try_claim("job", 60)
+    assert try_claim("job", 60)  # The holder renews its own claim
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    worker = ctx.Process(target=_claim_in_other_worker, args=("job", queue))
+    worker.start()
+    worker.join()
+    assert queue.get() is False
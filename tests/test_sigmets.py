@@ -0,0 +1,100 @@
+import time
+import threading
+import pytest
+from unittest.mock import patch
+from shapely.geometry import Polygon
+from app.corridor import build_corridor
+from app import sigmets as sigmets_module
+from app.sigmets import (
+    repair_polygon,
+    prepare_sigmets,
+    filter_sigmets_by_corridor,
+    display_locations,
+    load_sigmets,
+)
+
+KORD = (41.97, -87.90)
+KDEN = (39.85, -104.67)
+OK = {"source": "airsigmet", "status": "ok", "data_at": 0.0, "error": None}
+
+# Self-intersecting "bow-tie" straddling the KORD-KDEN route
+BOWTIE_SIGMET = {
+    "hazard": "CONVECTIVE",
+    "coords": [
+        {"lat": 40.0, "lon": -98.0},
+        {"lat": 42.0, "lon": -94.0},
+        {"lat": 40.0, "lon": -94.0},
+        {"lat": 42.0, "lon": -98.0},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_sigmet_cache():
+    sigmets_module._sigmet_cache.update({"fetched_at": 0.0, "entries": [], "source": None})
+    yield
+    sigmets_module._sigmet_cache.update({"fetched_at": 0.0, "entries": [], "source": None})
+
+
+def test_repair_keeps_both_lobes_of_bowtie():
+    polygon = Polygon([(0, 0), (1, 1), (1, 0), (0, 1)])
+    assert not polygon.is_valid
+    repaired = repair_polygon(polygon)
+    assert repaired.is_valid
+    assert repaired.area == pytest.approx(0.5)
+
+
+def test_repair_returns_none_for_degenerate_polygon():
+    assert repair_polygon(Polygon([(0, 0), (1, 1), (2, 2)])) is None
+
+
+def test_invalid_sigmet_is_not_dropped():
+    corridor = build_corridor(KORD, KDEN)
+    results = filter_sigmets_by_corridor([BOWTIE_SIGMET], corridor)
+    assert results == [BOWTIE_SIGMET]
+
+
+def test_prepare_precomputes_simplified_geometry():
+    entries = prepare_sigmets([BOWTIE_SIGMET, {"coords": []}])
+    assert len(entries) == 1
+    assert set(entries[0]["simplified"]) == set(sigmets_module.Config.SIGMET_SIMPLIFY_TOLERANCES)
+    assert all(g.is_valid for g in entries[0]["simplified"].values())
+    # One ring per lobe of the repaired bow-tie
+    assert len(display_locations(entries[0])) == 2
+
+
+def test_load_sigmets_reuses_parsed_set():
+    with patch("app.sigmets.fetch_sigmets", return_value=([BOWTIE_SIGMET], OK)) as mock_fetch:
+        first = load_sigmets()
+        second = load_sigmets()
+    assert first is second
+    assert mock_fetch.call_count == 1
+
+
+def test_empty_sigmet_set_is_cached():
+    with patch("app.sigmets.fetch_sigmets", return_value=([], OK)) as mock_fetch:
+        assert load_sigmets() == []
+        assert load_sigmets() == []
+    assert mock_fetch.call_count == 1
+
+
+def test_refresh_does_not_block_readers():
+    with patch("app.sigmets.fetch_sigmets", return_value=([BOWTIE_SIGMET], OK)):
+        cached = load_sigmets()
+
+    release = threading.Event()
+
+    def slow_fetch():
+        release.wait(2)
+        return [], OK
+
+    with patch("app.sigmets.fetch_sigmets", side_effect=slow_fetch):
+        refresher = threading.Thread(target=load_sigmets, kwargs={"refresh": True})
+        refresher.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        assert load_sigmets() is cached
+        assert time.monotonic() - started < 0.5
+        release.set()
+        refresher.join()
+    assert load_sigmets() == []
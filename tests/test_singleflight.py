@@ -0,0 +1,79 @@
+import threading
+from unittest.mock import patch
+from app import singleflight
+from app import atis as atis_module
+from app.atis import check_for_atis_change
+
+
+def run_concurrently(n, target):
+    """Start n threads on target, release them together and collect results."""
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_callers_share_one_computation():
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(1)
+        return "result"
+
+    threading.Timer(0.1, release.set).start()
+    results = run_concurrently(5, lambda: singleflight.do("k", compute))
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_error_is_shared_and_key_is_cleared():
+    release = threading.Event()
+
+    def fail():
+        release.wait(1)
+        raise ValueError("upstream down")
+
+    threading.Timer(0.1, release.set).start()
+    results = run_concurrently(3, lambda: singleflight.do("k", fail))
+    assert all(isinstance(r, ValueError) for r in results)
+    # A later call starts a fresh computation
+    assert singleflight.do("k", lambda: "ok") == "ok"
+
+
+def test_sequential_calls_are_not_coalesced():
+    calls = []
+    singleflight.do("k", lambda: calls.append(1))
+    singleflight.do("k", lambda: calls.append(1))
+    assert len(calls) == 2
+
+
+def test_concurrent_atis_checks_fetch_once():
+    release = threading.Event()
+    atis = {"airport": "KORD", "identifier": "METAR", "raw_text": "KORD 191952Z 27015KT"}
+
+    def slow_fetch(icao):
+        release.wait(1)
+        return atis
+
+    atis_module._last_obs.clear()
+    threading.Timer(0.1, release.set).start()
+    with patch("app.atis.fetch_atis", side_effect=slow_fetch) as mock_fetch, \
+         patch("app.atis.get_last_atis", return_value=dict(atis, fetched_at="2026-01-01 00:00:00")):
+        results = run_concurrently(4, lambda: check_for_atis_change("KORD"))
+    assert mock_fetch.call_count == 1
+    assert all(r["reason"] == "No change detected" for r in results)
+    atis_module._last_obs.clear()
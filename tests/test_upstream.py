@@ -0,0 +1,111 @@
+import time
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from app import upstream
+from app.upstream import (
+    upstream_get,
+    get_breaker,
+    combine_sources,
+    describe_sources,
+    fresh_source,
+    unavailable_source,
+    UpstreamUnavailable,
+)
+
+PARAMS = {"format": "json"}
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers(monkeypatch):
+    upstream._breakers.clear()
+    # Probes are driven by hand in these tests
+    monkeypatch.setattr("app.upstream.CircuitBreaker.schedule_probe", lambda self: None)
+    yield
+    upstream._breakers.clear()
+
+
+def ok_response(data):
+    response = MagicMock()
+    response.text = "[]" if data == [] else "x"
+    response.json.return_value = data
+    return response
+
+
+def test_success_is_fresh():
+    with patch("app.upstream.requests.get", return_value=ok_response([{"id": 1}])):
+        data, source = upstream_get("pirep", PARAMS)
+    assert data == [{"id": 1}]
+    assert source["status"] == "ok"
+    assert describe_sources([source])[0]["age_seconds"] == 0
+
+
+def test_failure_serves_last_good_with_its_own_age():
+    five_hours_ago = time.time() - 5 * 3600
+    with patch("app.upstream.requests.get", return_value=ok_response([{"id": 1}])), \
+         patch("app.upstream.time.time", return_value=five_hours_ago):
+        upstream_get("pirep", PARAMS)
+    # A fresh call for other params must not make the old fallback look new
+    with patch("app.upstream.requests.get", return_value=ok_response([{"id": 2}])):
+        upstream_get("pirep", {"format": "json", "age": 2})
+    with patch("app.upstream.requests.get", side_effect=requests.Timeout("timed out")):
+        data, source = upstream_get("pirep", PARAMS)
+    assert data == [{"id": 1}]
+    status = describe_sources([source])[0]
+    assert status["status"] == "stale"
+    assert status["age_seconds"] == pytest.approx(5 * 3600, abs=5)
+
+
+def test_failure_without_last_good_raises():
+    with patch("app.upstream.requests.get", side_effect=requests.ConnectionError("down")):
+        with pytest.raises(UpstreamUnavailable):
+            upstream_get("pirep", PARAMS)
+
+
+def test_combined_sources_keep_the_worst_status():
+    now = time.time()
+    merged = combine_sources([
+        fresh_source("pirep", "stale", now - 600, "timed out"),
+        unavailable_source("pirep", "down"),
+        fresh_source("pirep", "ok", now),
+    ])
+    assert len(merged) == 1
+    assert merged[0]["status"] == "partial"
+    assert merged[0]["data_at"] == now - 600
+
+
+def test_open_circuit_skips_upstream(monkeypatch):
+    monkeypatch.setattr("app.upstream.Config.BREAKER_FAILURE_THRESHOLD", 2)
+    with patch("app.upstream.requests.get", return_value=ok_response([{"id": 1}])):
+        upstream_get("airsigmet", PARAMS)
+    with patch("app.upstream.requests.get", side_effect=requests.Timeout("timed out")) as mock_get:
+        upstream_get("airsigmet", PARAMS)
+        upstream_get("airsigmet", PARAMS)
+        assert get_breaker("airsigmet").is_open
+        data, source = upstream_get("airsigmet", PARAMS)
+    assert data == [{"id": 1}]
+    assert mock_get.call_count == 2
+    assert describe_sources([source])[0]["breaker"] == "open"
+
+
+def test_slow_responses_trip_the_breaker(monkeypatch):
+    monkeypatch.setattr("app.upstream.Config.BREAKER_FAILURE_THRESHOLD", 1)
+    with patch("app.upstream.requests.get", return_value=ok_response([])), \
+         patch("app.upstream.time.monotonic", side_effect=[0, 30]):
+        assert upstream_get("metar", PARAMS)[0] == []
+    assert get_breaker("metar").is_open
+
+
+def test_probe_closes_breaker_on_recovery(monkeypatch):
+    monkeypatch.setattr("app.upstream.Config.BREAKER_FAILURE_THRESHOLD", 1)
+    with patch("app.upstream.requests.get", side_effect=requests.Timeout("timed out")):
+        with pytest.raises(UpstreamUnavailable):
+            upstream_get("pirep", PARAMS)
+    breaker = get_breaker("pirep")
+    assert breaker.is_open
+
+    with patch("app.upstream.requests.get", return_value=ok_response([{"id": 2}])):
+        breaker._probe()
+    assert not breaker.is_open
+    with patch("app.upstream.requests.get", return_value=ok_response([{"id": 2}])):
+        assert upstream_get("pirep", PARAMS)[1]["status"] == "ok"
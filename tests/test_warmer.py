@@ -0,0 +1,93 @@
+import multiprocessing
+from unittest.mock import patch
+from app.warmer import record_route_request, top_routes, warm_popular_routes, _once_per_host
+from app.pireps import get_route_pireps
+
+KORD = (41.97, -87.90)
+KDEN = (39.85, -104.67)
+COORDS = {"KORD": KORD, "KDEN": KDEN}
+OK = {"source": "pirep", "status": "ok", "data_at": 0.0, "error": None}
+
+
+def test_top_routes_ranked_by_frequency():
+    for _ in range(3):
+        record_route_request("KORD", "KDEN")
+    record_route_request("KSFO", "KLAX")
+    assert top_routes(2) == [("KORD", "KDEN"), ("KSFO", "KLAX")]
+    assert top_routes(1) == [("KORD", "KDEN")]
+
+
+def test_top_routes_prefers_recent_requests(monkeypatch):
+    monkeypatch.setattr("app.warmer.Config.ROUTE_HISTORY_HALF_LIFE_SECONDS", 1)
+    with patch("app.warmer.time.time", return_value=0):
+        record_route_request("KORD", "KDEN")
+        record_route_request("KORD", "KDEN")
+    with patch("app.warmer.time.time", return_value=10):
+        record_route_request("KSFO", "KLAX")
+        assert top_routes(1) == [("KSFO", "KLAX")]
+
+
+def test_faded_routes_are_pruned(monkeypatch):
+    monkeypatch.setattr("app.warmer.Config.ROUTE_HISTORY_HALF_LIFE_SECONDS", 1)
+    with patch("app.warmer.time.time", return_value=0):
+        record_route_request("KORD", "KDEN")
+    with patch("app.warmer.time.time", return_value=10):
+        record_route_request("KSFO", "KLAX")
+        assert top_routes(5) == [("KSFO", "KLAX")]
+
+
+def test_history_is_capped(monkeypatch):
+    monkeypatch.setattr("app.warmer.Config.ROUTE_HISTORY_MAX_ROUTES", 3)
+    record_route_request("KORD", "KDEN")
+    record_route_request("KORD", "KDEN")
+    for i in range(5):
+        record_route_request("KSFO", f"K{i:03d}")
+    routes = top_routes(10)
+    assert len(routes) == 3
+    assert routes[0] == ("KORD", "KDEN")
+
+
+def test_history_is_shared_across_workers():
+    worker = multiprocessing.get_context("fork").Process(target=record_route_request, args=("KORD", "KDEN"))
+    worker.start()
+    worker.join()
+    assert top_routes(1) == [("KORD", "KDEN")]
+
+
+def test_route_pireps_served_from_cache():
+    with patch("app.pireps.build_route_pireps", return_value=([{"lat": 1}], OK)) as mock_build:
+        first = get_route_pireps("KORD", "KDEN", COORDS)
+        second = get_route_pireps("KORD", "KDEN", COORDS)
+    assert first == second == ([{"lat": 1}], OK)
+    assert mock_build.call_count == 1
+
+
+def test_warm_popular_routes_refreshes_cache():
+    record_route_request("KORD", "KDEN")
+    with patch("app.airports.get_coords", side_effect=COORDS.get), \
+         patch("app.sigmets.load_sigmets"), \
+         patch("app.pireps.build_route_pireps", return_value=([], OK)) as mock_build:
+        warmed = warm_popular_routes()
+        # Users now hit the warm cache
+        get_route_pireps("KORD", "KDEN", COORDS)
+    assert warmed == [("KORD", "KDEN")]
+    assert mock_build.call_count == 1
+
+
+def test_warm_popular_routes_respects_time_budget():
+    record_route_request("KORD", "KDEN")
+    with patch("app.sigmets.load_sigmets"), \
+         patch("app.warmer.time.monotonic", side_effect=[0, 100]):
+        assert warm_popular_routes(time_budget=5) == []
+
+
+def test_scheduled_jobs_skip_when_another_worker_holds_the_claim():
+    runs = []
+
+    def job():
+        runs.append(1)
+
+    with patch("app.warmer.try_claim", side_effect=[True, False]):
+        _once_per_host(job, 60)()
+        _once_per_host(job, 60)()
+    assert runs == [1]